@@ -1,19 +1,19 @@
-import pygame
 import numpy as np
 import os
 import wave
-import struct
 
-# Initialize pygame mixer
-pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
+# Stereo frames synthesised and written at a time
+BLOCK_SIZE = 16384
 
-# Function to save a numpy array as a WAV file
+# Split a (samples, 2) array into blocks of at most block_size frames
+def split_blocks(data, block_size=BLOCK_SIZE):
+    for start in range(0, len(data), block_size):
+        yield data[start:start + block_size]
+
+# Function to save a numpy array, or an iterable of (frames, 2) blocks, as a WAV file
 def save_wav(filename, data, sample_rate=44100):
-    # Ensure data is in the range [-1, 1]
-    data = np.clip(data, -1, 1)
-    
-    # Convert to 16-bit PCM
-    data = (data * 32767).astype(np.int16)
+    if isinstance(data, np.ndarray):
+        data = split_blocks(data)
     
     # Open WAV file for writing
     with wave.open(filename, 'w') as wav_file:
@@ -22,9 +22,14 @@ def save_wav(filename, data, sample_rate=44100):
         wav_file.setsampwidth(2)  # 2 bytes = 16 bits
         wav_file.setframerate(sample_rate)
         
-        # Write data
-        for sample in data:
-            wav_file.writeframes(struct.pack('<hh', sample[0], sample[1]))
+        for block in data:
+            # Ensure data is in the range [-1, 1]
+            block = np.clip(block, -1, 1)
+            
+            # Convert to interleaved little-endian 16-bit PCM and write the array's
+            # buffer directly
+            pcm = np.ascontiguousarray((block * 32767).astype('<i2'))
+            wav_file.writeframes(pcm)
     
     print(f"Saved {filename}")
 
@@ -162,14 +167,22 @@ def create_win_sound():
     
     return buffer
 
-# Create a gentle background music (soft ambient loop)
-def create_background_music():
+# Create a gentle background music (soft ambient loop), one block at a time so a long
+# track never has to fit in memory
+def background_music_blocks(duration=8.0, block_size=BLOCK_SIZE):
     sample_rate = 44100
-    duration = 8.0  # 8 seconds loop
-    buffer = np.zeros((int(sample_rate * duration), 2), dtype=np.float32)
+    num_samples = int(sample_rate * duration)
+    step = duration / num_samples  # Same sample times as np.linspace(0, duration, num_samples, False)
+    fade_samples = int(0.5 * sample_rate)
     
-    # Generate a base ambient tone
-    t = np.linspace(0, duration, int(sample_rate * duration), False)
+    for start in range(0, num_samples, block_size):
+        index = np.arange(start, min(start + block_size, num_samples))
+        t = index * step
+        yield background_music_block(index, t, num_samples, fade_samples)
+
+# Synthesise the background samples at the given sample indices and times
+def background_music_block(index, t, num_samples, fade_samples):
+    buffer = np.zeros((len(t), 2), dtype=np.float32)
     
     # Use pleasant chord frequencies (C major)
     freqs = [
@@ -206,19 +219,26 @@ def create_background_music():
     buffer[:, 0] *= mod
     buffer[:, 1] *= mod
     
-    # Apply fade in and fade out for looping
-    fade_samples = int(0.5 * sample_rate)
+    # Apply fade in and fade out for looping, ramping over the first and last fade_samples
     if fade_samples > 0:
-        buffer[:fade_samples, 0] *= np.linspace(0, 1, fade_samples)
-        buffer[:fade_samples, 1] *= np.linspace(0, 1, fade_samples)
-        buffer[-fade_samples:, 0] *= np.linspace(1, 0, fade_samples)
-        buffer[-fade_samples:, 1] *= np.linspace(1, 0, fade_samples)
+        fade_in = index < fade_samples
+        ramp = index[fade_in] / (fade_samples - 1)
+        buffer[fade_in, 0] *= ramp
+        buffer[fade_in, 1] *= ramp
+        fade_out = index >= num_samples - fade_samples
+        ramp = (num_samples - 1 - index[fade_out]) / (fade_samples - 1)
+        buffer[fade_out, 0] *= ramp
+        buffer[fade_out, 1] *= ramp
     
     # Ensure we don't clip
     buffer = np.clip(buffer, -0.9, 0.9)
     
     return buffer
 
+# Whole background loop as one array
+def create_background_music(duration=8.0):
+    return np.concatenate(list(background_music_blocks(duration)))
+
 # Create and save sounds
 def main():
     print("Creating sound effects...")
@@ -242,10 +262,9 @@ def main():
     win_sound = create_win_sound()
     save_wav(os.path.join(sounds_dir, "win.wav"), win_sound)
     
-    # Create and save background music
+    # Create and save background music, streaming it to disk block by block
     print("Creating background music...")
-    bg_music = create_background_music()
-    save_wav(os.path.join(sounds_dir, "background.wav"), bg_music)
+    save_wav(os.path.join(sounds_dir, "background.wav"), background_music_blocks())
     
     print("All sound effects created successfully!")
     print("Restart the game to use the new sounds.")
@@ -0,0 +1,223 @@
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+
+# Render off-screen unless the caller asked for a real display
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+import katamari_game as game
+
+# Stages of one frame of the main() loop, in the order they run. "input" is the time the
+# input policy takes to decide, which is what the autopilot costs.
+SIMULATION_STAGES = ["movement", "powerups", "objects", "collisions", "progress", "spawning"]
+DRAW_STAGES = ["background", "draw_objects", "draw_powerups", "draw_player", "draw_ui"]
+STAGES = ["input"] + SIMULATION_STAGES + DRAW_STAGES
+POLICIES = {"random": game.RandomWalkPolicy, "autopilot": game.AutopilotPolicy}
+
+DEFAULT_COUNTS = [100, 1000, 10000, 100000]
+DEFAULT_SIZES = ["800x600", "1280x720", "1920x1080", "3840x2160"]
+
+# Short commit hash of the working tree, so results can be compared across commits
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# Point the game at a display surface of the given size
+def set_screen_size(width, height):
+    game.SCREEN_WIDTH = width
+    game.SCREEN_HEIGHT = height
+    game.init_display((width, height), 0)
+    game.clear_text_cache()
+
+# Build a playing world with the given object population. The chunks loaded around the
+# player grow with the population to keep the default density, or, with a fixed world
+# size, the whole world is loaded and its density raised to fit the population.
+def build_world(count, seed, world_size=None, screen_size=(game.DEFAULT_SCREEN_WIDTH, game.DEFAULT_SCREEN_HEIGHT)):
+    if world_size is None:
+        chunks_across = math.ceil(math.sqrt(count / game.OBJECTS_PER_CHUNK))
+        world_size = max(3000, chunks_across * game.WORLD_CHUNK_SIZE)
+    else:
+        chunks_across = math.ceil(world_size / game.WORLD_CHUNK_SIZE)
+        game.OBJECTS_PER_CHUNK = math.ceil(count / chunks_across**2)
+    game.WORLD_SIZE = world_size
+    game.WORLD_CHUNK_RADIUS = max(2, chunks_across // 2)
+    game.OBJECT_REFILL = max(20, count // 5)
+    
+    world = game.World(seed, screen_size=screen_size)
+    world.step(game.PlayerInput(space=True))
+    return world
+
+# Give the player a magnet so the magnet pass is part of every measured frame
+def keep_magnet(world):
+    if world.player.magnet_range == 0:
+        magnet = game.PowerUp(world.player.world_x, world.player.world_y)
+        magnet.type = next(t for t in game.PowerUp.TYPES if t["name"] == "magnet")
+        magnet.name = magnet.type["name"]
+        magnet.color = magnet.type["color"]
+        magnet.duration = magnet.type["duration"]
+        world.player.apply_powerup(magnet)
+
+# Run one frame, appending the wall time of each stage in seconds
+def timed_frame(world, inputs, timings):
+    camera = world.camera
+    world.events = []
+    
+    def draw_powerups():
+        for powerup in world.powerups:
+            powerup.draw(camera)
+    
+    # Same work as World.step followed by draw_world, split into stages
+    stages = [
+        ("movement", lambda: world.step_movement(inputs)),
+        ("powerups", world.step_powerups),
+        ("objects", world.step_objects),
+        ("collisions", world.step_collisions),
+        ("progress", world.step_progress),
+        ("spawning", world.step_spawning),
+        ("background", lambda: game.draw_grass_background(camera)),
+        ("draw_objects", lambda: world.objects.draw(camera)),
+        ("draw_powerups", draw_powerups),
+        ("draw_player", lambda: (world.particles.draw(camera), world.player.draw(camera))),
+        ("draw_ui", lambda: game.draw_ui(world.player, world.current_level, world.level_goals))
+    ]
+    for stage, run in stages:
+        start = time.perf_counter()
+        run()
+        timings[stage].append(time.perf_counter() - start)
+    
+    world.frame += 1
+
+# Summarise a list of durations in milliseconds
+def summarise(samples):
+    samples = np.asarray(samples) * 1000
+    return {
+        "mean_ms": round(float(samples.mean()), 4),
+        "p50_ms": round(float(np.percentile(samples, 50)), 4),
+        "p95_ms": round(float(np.percentile(samples, 95)), 4),
+        "max_ms": round(float(samples.max()), 4)
+    }
+
+# Time one (population, screen size) case on a world of its own, so a case measures the
+# same whatever other cases run alongside it
+def run_case(count, world_size, width, height, frames, warmup, seed, magnet, policy="random"):
+    set_screen_size(width, height)
+    for cache in (game.sprite_cache, game.dot_sprites, game.halo_sprites):
+        cache.clear()
+    world = build_world(count, seed, world_size, (width, height))
+    
+    # Scripted input: the random walk from the headless mode or the autopilot, without SPACE presses
+    driver = POLICIES[policy](seed)
+    timings = {stage: [] for stage in STAGES}
+    for frame in range(warmup + frames):
+        if frame == warmup:
+            timings = {stage: [] for stage in STAGES}
+        if magnet:
+            keep_magnet(world)
+        start = time.perf_counter()
+        inputs = driver(world)
+        timings["input"].append(time.perf_counter() - start)
+        inputs.space = False
+        timed_frame(world, inputs, timings)
+    
+    frame_times = np.sum([timings[stage] for stage in STAGES], axis=0)
+    return {
+        "objects": len(world.objects),
+        "world_size": game.WORLD_SIZE,
+        "screen": f"{width}x{height}",
+        "policy": policy,
+        "frame": summarise(frame_times),
+        "stages": {stage: summarise(timings[stage]) for stage in STAGES}
+    }
+
+# Print the per-stage mean of one result as a table row
+def print_row(result):
+    cells = [f"{result['frame']['mean_ms']:8.2f}"] + [f"{result['stages'][stage]['mean_ms']:8.2f}" for stage in STAGES]
+    print(f"{result['objects']:>7} {result['screen']:>10} " + " ".join(cells))
+
+# Print how each stage's mean changed against an earlier results file
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {(r["objects_requested"], r["screen"]): r for r in json.load(f)["results"]}
+    print(f"\nChange against {baseline_path} (new mean / old mean):")
+    for result in results:
+        old = baseline.get((result["objects_requested"], result["screen"]))
+        if old is None:
+            continue
+        ratios = []
+        for stage in ["frame"] + STAGES:
+            new_ms = result["frame"]["mean_ms"] if stage == "frame" else result["stages"][stage]["mean_ms"]
+            # Results from before a stage was split out don't have it
+            old_ms = old["frame"]["mean_ms"] if stage == "frame" else old["stages"].get(stage, {}).get("mean_ms", 0)
+            ratios.append(f"{new_ms / old_ms:8.2f}" if old_ms > 0 else "       -")
+        print(f"{result['objects_requested']:>7} {result['screen']:>10} " + " ".join(ratios))
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Time each stage of the Katamari Adventure frame loop")
+    parser.add_argument("--counts", type=int, nargs="+", default=DEFAULT_COUNTS,
+                        help="object populations to sweep")
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES,
+                        help="screen sizes to sweep, as WIDTHxHEIGHT")
+    parser.add_argument("--frames", type=int, default=120, help="measured frames per case")
+    parser.add_argument("--warmup", type=int, default=30, help="unmeasured frames before each case")
+    parser.add_argument("--seed", type=int, default=1, help="master seed for every case")
+    parser.add_argument("--world-size", type=int, default=None,
+                        help="fixed world size (default: grow the world to keep the normal object density)")
+    parser.add_argument("--policy", choices=POLICIES, default="random",
+                        help="what drives the player: a random walk, or the autopilot chasing objects")
+    parser.add_argument("--no-magnet", action="store_true", help="don't keep a magnet power-up active")
+    parser.add_argument("--output", default="benchmark_results.json", help="where to write the JSON results")
+    parser.add_argument("--compare", metavar="JSON", help="earlier results file to compare against")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = [tuple(int(v) for v in size.lower().split("x")) for size in args.sizes]
+    
+    print("objects     screen    frame " + " ".join(f"{stage[:8]:>8}" for stage in STAGES))
+    results = []
+    for count in args.counts:
+        for width, height in sizes:
+            result = run_case(count, args.world_size, width, height, args.frames, args.warmup, args.seed,
+                              not args.no_magnet, args.policy)
+            result["objects_requested"] = count
+            results.append(result)
+            print_row(result)
+    
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "seed": args.seed,
+            "frames": args.frames,
+            "warmup": args.warmup,
+            "magnet": not args.no_magnet,
+            "policy": args.policy,
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "stages": STAGES
+        },
+        "results": results
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
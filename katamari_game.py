@@ -1,8 +1,67 @@
 import pygame
+import pygame.gfxdraw
+import argparse
+import gzip
+import hashlib
 import random
 import math
 import os
+import struct
+import tempfile
+import time
 import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Random streams, one per subsystem, so cosmetic effects and terrain never disturb
+# world generation. set_master_seed seeds them all from one number.
+world_rng = random.Random(0)  # Object and power-up spawning
+effects_rng = random.Random(0)  # Particles and other cosmetic randomness
+master_seed = 0  # Terrain features are hashed from this, see generate_terrain_features
+
+# Mix integers into a 64-bit seed (splitmix64 finaliser), stable across runs and platforms
+def hash_seed(*values):
+    h = 0x9E3779B97F4A7C15
+    for value in values:
+        h = (h ^ (value & 0xFFFFFFFFFFFFFFFF)) * 0xBF58476D1CE4E5B9 & 0xFFFFFFFFFFFFFFFF
+        h = (h ^ (h >> 27)) * 0x94D049BB133111EB & 0xFFFFFFFFFFFFFFFF
+        h ^= h >> 31
+    return h
+
+def set_master_seed(seed=None):
+    global master_seed
+    if seed is None:
+        seed = random.getrandbits(32)
+    master_seed = seed
+    world_rng.seed(hash_seed(seed, 1))
+    effects_rng.seed(hash_seed(seed, 2))
+    
+    # Baked terrain belongs to the previous seed
+    terrain_chunks.clear()
+    return seed
+
+# Surfaces created so far, sampled by the profiler to count allocations per frame
+surface_allocations = 0
+
+# Create a surface, counting it as an allocation
+def new_surface(size, flags=0):
+    global surface_allocations
+    surface_allocations += 1
+    return pygame.Surface(size, flags)
+
+# Screen regions drawn this frame, collected only while a DirtyRectRenderer is drawing.
+# HUD widgets are collected separately as name -> (rect, state) so unchanged ones can
+# be skipped when presenting.
+dirty_rects = None
+hud_widgets = None
+
+def mark_dirty(rect):
+    if dirty_rects is not None:
+        dirty_rects.append(pygame.Rect(rect))
+
+def mark_hud(name, rect, state):
+    if hud_widgets is not None:
+        hud_widgets[name] = (pygame.Rect(rect), state)
 
 # Power-up class
 class PowerUp:
@@ -13,20 +72,21 @@ class PowerUp:
         {"name": "growth", "color": (255, 150, 0), "duration": 6, "icon": "⬆️"}
     ]
     
-    def __init__(self, x, y):
+    def __init__(self, x, y, rng=None):
+        rng = world_rng if rng is None else rng
         self.world_x = x
         self.world_y = y
         self.x = x  # Screen coordinates, will be updated by camera
         self.y = y
-        self.size = 15
+        self.size = POWERUP_SIZE
         self.bounce = 0
         self.bounce_dir = 1
-        self.rotation = random.randint(0, 360)
-        self.anim_offset = random.randint(0, 100)
-        self.anim_speed = random.uniform(0.02, 0.05)
+        self.rotation = rng.randint(0, 360)
+        self.anim_offset = rng.randint(0, 100)
+        self.anim_speed = rng.uniform(0.02, 0.05)
         
         # Choose a random power-up type
-        self.type = random.choice(PowerUp.TYPES)
+        self.type = rng.choice(PowerUp.TYPES)
         self.color = self.type["color"]
         self.name = self.type["name"]
         self.duration = self.type["duration"]
@@ -44,34 +104,20 @@ class PowerUp:
     def draw(self, camera):
         # Convert world coordinates to screen coordinates
         self.x, self.y = camera.apply(self.world_x, self.world_y)
+        size = self.size * camera.scale
         
         # Only draw if on screen (with a small buffer)
-        if (-self.size*2 <= self.x <= SCREEN_WIDTH + self.size*2 and
-            -self.size*2 <= self.y <= SCREEN_HEIGHT + self.size*2):
+        if (-size*2 <= self.x <= SCREEN_WIDTH + size*2 and
+            -size*2 <= self.y <= SCREEN_HEIGHT + size*2):
             
             # Apply bounce animation
-            y_offset = math.sin(pygame.time.get_ticks() * self.anim_speed + self.anim_offset) * 5
-            
-            # Draw glowing effect
-            glow_size = self.size * 1.5 + math.sin(pygame.time.get_ticks() * 0.01) * 2
-            glow_surface = pygame.Surface((int(glow_size*2), int(glow_size*2)), pygame.SRCALPHA)
-            for i in range(3):
-                alpha = 100 - i * 30
-                size = glow_size - i * 2
-                pygame.draw.circle(glow_surface, (*self.color, alpha), 
-                                 (int(glow_size), int(glow_size)), int(size))
-            screen.blit(glow_surface, 
-                      (int(self.x - glow_size), int(self.y - glow_size + y_offset)))
-            
-            # Draw power-up
-            pygame.draw.circle(screen, self.color, 
-                             (int(self.x), int(self.y + y_offset)), int(self.size))
+            y_offset = math.sin(pygame.time.get_ticks() * self.anim_speed + self.anim_offset) * 5 * camera.scale
             
-            # Draw icon or symbol
-            font = pygame.font.Font(None, 24)
-            icon_text = font.render(self.icon, True, WHITE)
-            screen.blit(icon_text, (int(self.x - icon_text.get_width()/2), 
-                                  int(self.y - icon_text.get_height()/2 + y_offset)))
+            # Glow, body and icon come from one cached sprite per on-screen size and glow size
+            glow_size = size * 1.5 + math.sin(pygame.time.get_ticks() * 0.01) * 2 * camera.scale
+            key = ("powerup", self.name, max(1, int(size)), int(glow_size * 2))
+            sprite, anchor = sprite_cache.get(key, lambda: render_powerup_sprite(self.type, key[2], key[3] / 2))
+            mark_dirty(screen.blit(sprite, (int(self.x - anchor[0]), int(self.y - anchor[1] + y_offset))))
     
     def check_collision(self, player):
         # Calculate distance between centers in world coordinates
@@ -79,19 +125,55 @@ class PowerUp:
         # Check if circles overlap
         return distance < (self.size + player.size)
 
-# Initialize Pygame
-pygame.init()
-pygame.mixer.init()  # Initialize sound mixer
+# Render a power-up with its glow around it
+def render_powerup_sprite(powerup_type, size, glow_size):
+    center = int(glow_size)
+    surface = new_surface((int(glow_size*2), int(glow_size*2)), pygame.SRCALPHA)
+    
+    # Draw glowing effect
+    for i in range(3):
+        alpha = 100 - i * 30
+        ring_size = glow_size - i * 2
+        pygame.draw.circle(surface, (*powerup_type["color"], alpha), (center, center), int(ring_size))
+    
+    # Draw power-up
+    pygame.draw.circle(surface, powerup_type["color"], (center, center), int(size))
+    
+    # Draw icon or symbol, scaled with the power-up and left out once it's too small to read
+    icon_size = int(24 * size / POWERUP_SIZE)
+    if icon_size >= 8:
+        icon_text = get_font(icon_size).render(powerup_type["icon"], True, WHITE)
+        surface.blit(icon_text, (int(center - icon_text.get_width()/2), int(center - icon_text.get_height()/2)))
+    return surface, (center, center)
+
+# Seconds spent in each start-up phase, in the order they first ran, and when start-up
+# began: once pygame and numpy are imported, before the display, world and assets
+startup_times = {}
+startup_start = time.perf_counter()
+
+# Call func and add the time it took to a start-up phase
+def timed_startup(phase, func, *args):
+    start_time = time.perf_counter()
+    result = func(*args)
+    startup_times[phase] = startup_times.get(phase, 0) + time.perf_counter() - start_time
+    return result
+
+def print_startup_report():
+    print("Start-up time per phase:")
+    for phase, seconds in startup_times.items():
+        print(f"  {phase:<18}{seconds * 1000:8.1f} ms")
+    print(f"  {'sum':<18}{sum(startup_times.values()) * 1000:8.1f} ms  (asset jobs overlap, so this exceeds the wall time)")
 
-# Get the screen info for fullscreen support
-screen_info = pygame.display.Info()
 DEFAULT_SCREEN_WIDTH = 800
 DEFAULT_SCREEN_HEIGHT = 600
 
 # Game constants
 SCREEN_WIDTH = DEFAULT_SCREEN_WIDTH
 SCREEN_HEIGHT = DEFAULT_SCREEN_HEIGHT
-FPS = 60
+FPS = 60  # Default cap on rendered frames per second
+SIM_RATE = 60  # Simulation steps per second, independent of the frame rate
+SIM_DT = 1 / SIM_RATE
+MAX_FRAME_TIME = 0.25  # Longest frame the simulation catches up on, so a stall can't snowball
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 RED = (255, 0, 0)
@@ -109,29 +191,94 @@ PLAYER_START_SIZE = 20
 WIN_SIZE = 100
 SHRINK_FACTOR = 0.9
 GROW_FACTOR = 1.1
-WORLD_SIZE = 3000  # Large world size
+WORLD_SIZE = 3000  # Side of the square world, None for a world without edges
+WORLD_CHUNK_SIZE = 500  # Objects and power-ups are generated, loaded and saved in square chunks this big
+WORLD_CHUNK_RADIUS = 2  # Chunks loaded in every direction around the player's chunk
+SAVED_CHUNK_LIMIT = 1024  # Left-behind chunks kept, older ones are generated afresh when revisited
+OBJECT_MIN_SIZE = 5
+OBJECT_MAX_SIZE = 40
+POWERUP_SIZE = 15
+POWERUP_SPACING = 40  # Minimum distance between two power-ups
+SPAWN_ATTEMPTS = 30  # Random positions tried per spawned entity before giving up
+TEXT_CACHE_SIZE = 256  # Rendered text surfaces kept before the least recently used is dropped
+TERRAIN_CHUNK_SIZE = 500  # Terrain is generated and baked in square chunks of this many world units
+TERRAIN_CHUNK_CACHE_SIZE = 16  # Minimum number of baked terrain chunks kept around the camera
+PROFILER_HISTORY = 600  # Frames kept in the profiler ring buffer (10 seconds at 60 FPS)
+PROFILER_REFRESH = 15  # Frames between updates of the profiler overlay text
+SPRITE_CACHE_SIZE = 2048  # Pre-rendered sprites kept before the least recently used is dropped
+SPRITE_CACHE_BYTES = 64 * 1024 * 1024  # Pixel memory the sprite cache may use
+PLAYER_SPRITE_MAX_RADIUS = 128  # A bigger player is drawn straight onto the screen instead of cached
+ROTATION_BUCKETS = 16  # Distinct rotations rendered per symmetry period of a shape
+ANIMATION_FRAMES = 8  # Distinct frames rendered per wing/tail animation cycle
+LOD_FLAT_SIZE = 4  # Objects with a smaller on-screen diameter are drawn as a flat circle
+LOD_DETAIL_SIZE = OBJECT_MIN_SIZE * 2  # Objects with a smaller on-screen diameter are drawn as a simple silhouette
+ZOOM_TARGET_FRACTION = 0.1  # Share of the screen's shorter side the player's radius may fill before the camera zooms out
+ZOOM_EASING = 0.05  # Fraction of the way to the target zoom the camera moves each step
+MIN_ZOOM = 0.1  # Furthest the camera zooms out
+ZOOM_STEPS = 16  # Distinct zoom levels per halving; sprites and terrain are cached at each level
+TERRAIN_CACHE_BYTES = 128 * 1024 * 1024  # Pixel memory of baked and scaled terrain chunks
+DOT_SPRITE_CACHE_SIZE = 512  # Pre-rendered particle dots kept before the least recently used is dropped
+DOT_SPRITE_CACHE_BYTES = 8 * 1024 * 1024  # Pixel memory the dot cache may use
+PARTICLE_ALPHA_LEVELS = 16  # Distinct fade levels particle dots are drawn with
+TRAIL_LIFE = 6  # Steps a trail dot stays behind the player
+HALO_CACHE_SIZE = 256  # Pre-rendered glows and halos kept before the least recently used is dropped
+HALO_CACHE_BYTES = 32 * 1024 * 1024  # Pixel memory the halo cache may use
+HALO_MAX_BYTES = 4 * 1024 * 1024  # Bigger halos are drawn straight onto the screen instead of cached
+DIRTY_RECT_LIMIT = 300  # Changed regions per frame above which a full flip is cheaper
+OBJECTS_PER_CHUNK = 3  # Objects generated per chunk, and kept per loaded chunk by topping up
+OBJECT_REFILL = 20  # Objects spawned per top-up
+POWERUP_COUNT = 5  # Power-ups kept around the player, topped up when it drops below this
+POWERUP_CHUNK_CHANCE = 0.15  # Chance of a chunk being generated with a power-up
+LEVEL_GOALS = [100, 200, 300, 400, 500]  # Size goals for each level
+GRID_CELL_SIZE = 100  # Cell size of the collision grid in world units
+AUTOPILOT_SEARCH_RADIUS = 3000  # Furthest the autopilot looks for an object it can absorb
+AUTOPILOT_LOOKAHEAD = 3  # The autopilot steers clear of bigger objects within this many of its radii
+AUTOPILOT_POWERUP_RANGE = 400  # Power-ups the autopilot will detour for
+AUTOPILOT_POWERUP_BIAS = 2.0  # A power-up is taken over an object up to this many times nearer
+ASSET_WORKERS = 4  # Threads loading sounds and baking terrain while the start screen is up
 
 # Sound settings
 sound_enabled = True
 
-# Set up the display (windowed by default)
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.RESIZABLE)
-pygame.display.set_caption("Katamari Adventure")
-clock = pygame.time.Clock()
+# Display, created by init_display (importing the module opens no window)
+screen = None
+clock = None
 
 # Fullscreen flag
 fullscreen = False
 
-# Create assets directory if it doesn't exist
+# Asset locations
 assets_dir = os.path.join(os.path.dirname(__file__), "assets")
-os.makedirs(assets_dir, exist_ok=True)
 sounds_dir = os.path.join(assets_dir, "sounds")
-os.makedirs(sounds_dir, exist_ok=True)
 
-# Create a simple sound directly in memory
-def create_simple_sound(frequency=440, duration=0.3, volume=0.5):
-    # Create a simple beep sound
-    sample_rate = 44100
+# Open the game window (windowed by default) and start the subsystems drawing needs
+def init_display(size=None, flags=pygame.RESIZABLE):
+    global screen, clock
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode(size or (SCREEN_WIDTH, SCREEN_HEIGHT), flags)
+    pygame.display.set_caption("Katamari Adventure")
+    
+    # Start the frame clock, which also starts the timer animations read with get_ticks
+    clock = pygame.time.Clock()
+    clock.tick()
+    return screen
+
+# Start the sound mixer, returning False when there is no audio device
+def init_audio():
+    try:
+        pygame.mixer.init()  # Initialize sound mixer
+        return True
+    except pygame.error as e:
+        print(f"Could not start audio: {e}")
+        return False
+
+# Synthesised sounds are cached here, one file per set of synthesis parameters
+sound_cache_dir = os.path.join(assets_dir, "cache", "sounds")
+SOUND_CACHE_VERSION = 1  # Part of every cache key, bump it when the synthesis code changes
+
+# Samples of a simple beep sound
+def synthesize_tone(frequency=440, duration=0.3, volume=0.5, sample_rate=44100, fade=0.05):
     num_samples = int(sample_rate * duration)
     buf = np.zeros((num_samples, 2), dtype=np.float32)
     
@@ -140,7 +287,6 @@ def create_simple_sound(frequency=440, duration=0.3, volume=0.5):
     tone = np.sin(2 * np.pi * frequency * t) * volume
     
     # Apply fade in/out
-    fade = 0.05
     fade_samples = int(fade * sample_rate)
     if fade_samples > 0:
         if fade_samples * 2 < num_samples:
@@ -151,147 +297,565 @@ def create_simple_sound(frequency=440, duration=0.3, volume=0.5):
     buf[:, 0] = tone
     buf[:, 1] = tone
     
-    return pygame.sndarray.make_sound(buf)
+    return buf
 
-# Create sound files if they don't exist
-def create_sound_files():
-    print("Creating placeholder sounds in memory...")
-    
-    # Create simple sounds with different frequencies
-    grow_sound = create_simple_sound(frequency=800, duration=0.3)
-    shrink_sound = create_simple_sound(frequency=300, duration=0.3)
-    win_sound = create_simple_sound(frequency=600, duration=1.0)
-    bg_sound = create_simple_sound(frequency=200, duration=2.0, volume=0.2)
+# Cache file for a set of synthesis parameters, named after a hash of them so changed
+# parameters never pick up stale samples
+def sound_cache_path(params):
+    key = repr((SOUND_CACHE_VERSION, sorted(params.items())))
+    return os.path.join(sound_cache_dir, hashlib.sha256(key.encode()).hexdigest()[:32] + ".npy")
+
+# Samples for the given synthesis parameters, synthesised the first time and read back
+# from the cache afterwards
+def cached_tone(**params):
+    path = sound_cache_path(params)
+    try:
+        return np.load(path, allow_pickle=False)
+    except (OSError, ValueError):
+        pass  # Not cached yet, or a damaged file that gets replaced below
     
-    return {
-        "grow": grow_sound,
-        "shrink": shrink_sound,
-        "win": win_sound,
-        "background": bg_sound
-    }
+    buf = synthesize_tone(**params)
+    try:
+        # Write to a temporary file first so a reader never sees half a file
+        os.makedirs(sound_cache_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=sound_cache_dir)
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, buf)
+        os.replace(temp_path, path)
+    except OSError as e:
+        print(f"Could not cache synthesised sound: {e}")
+    return buf
+
+# Create a simple sound directly in memory
+def create_simple_sound(frequency=440, duration=0.3, volume=0.5):
+    buf = cached_tone(frequency=frequency, duration=duration, volume=volume, sample_rate=44100, fade=0.05)
+    return pygame.sndarray.make_sound(buf)
+
+# Frequency, duration and volume of the placeholder tone for each sound
+SOUND_TONES = {
+    "grow": (800, 0.3, 0.5),
+    "shrink": (300, 0.3, 0.5),
+    "win": (600, 1.0, 0.5),
+    "background": (200, 2.0, 0.2)
+}
+
+# Load one sound, creating a placeholder tone if its file is missing or unreadable
+def load_sound(name):
+    try:
+        return pygame.mixer.Sound(os.path.join(sounds_dir, f"{name}.wav"))
+    except Exception as e:
+        print(f"Error loading {name}.wav: {e}")
+        print(f"Creating a placeholder {name} sound instead...")
+        return create_simple_sound(*SOUND_TONES[name])
 
 # Load or create sounds
-try:
+def load_sounds():
     print("Attempting to load sound files...")
-    sounds = {
-        "grow": pygame.mixer.Sound(os.path.join(sounds_dir, "grow.wav")),
-        "shrink": pygame.mixer.Sound(os.path.join(sounds_dir, "shrink.wav")),
-        "win": pygame.mixer.Sound(os.path.join(sounds_dir, "win.wav")),
-        "background": pygame.mixer.Sound(os.path.join(sounds_dir, "background.wav"))
-    }
-    print("Sound files loaded successfully!")
-except Exception as e:
-    print(f"Error loading sound files: {e}")
-    print("Creating placeholder sounds instead...")
-    # If sounds don't exist, create them in memory
-    sounds = create_sound_files()
-
-# Generate realistic grass texture
-def create_grass_texture():
-    texture = pygame.Surface((100, 100))
-    
-    # Create a more natural-looking base
-    for y in range(100):
-        for x in range(100):
-            # Create a subtle noise pattern for the base
-            noise = random.randint(-10, 10)
-            # Vary the green based on position and noise
-            green_value = 100 + int((y / 100) * 30) + noise
-            green_value = max(80, min(160, green_value))  # Keep in reasonable range
-            base_color = (30, green_value, 30)
-            texture.set_at((x, y), base_color)
-    
-    # Add more varied grass blades
-    for _ in range(120):
-        x = random.randint(0, 99)
-        y = random.randint(20, 99)  # Start a bit down for more ground coverage
-        height = random.randint(3, 12)
-        width = random.randint(1, 2)
-        
-        # More natural green variations
-        green_shade = random.randint(130, 220)
-        red_value = random.randint(20, 60)
-        blue_value = random.randint(20, 60)
-        color = (red_value, green_shade, blue_value)
-        
-        # Draw grass blade with slight angle
-        angle = random.randint(-20, 20)
-        end_x = x + int(math.sin(math.radians(angle)) * height)
-        end_y = y - height
-        pygame.draw.line(texture, color, (x, y), (end_x, end_y), width)
-    
-    # Add some dirt/soil patches
-    for _ in range(8):
-        x = random.randint(10, 90)
-        y = random.randint(10, 90)
-        size = random.randint(4, 8)
-        brown_shade = random.randint(80, 120)
-        color = (brown_shade, brown_shade//2, 0)
-        pygame.draw.circle(texture, color, (x, y), size)
-        
-        # Add texture to the dirt
-        for i in range(4):
-            small_x = x + random.randint(-size//2, size//2)
-            small_y = y + random.randint(-size//2, size//2)
-            small_size = random.randint(1, 2)
-            dark_brown = (brown_shade-30, (brown_shade-30)//2, 0)
-            pygame.draw.circle(texture, dark_brown, (small_x, small_y), small_size)
-    
-    # Add some small flowers or details
-    for _ in range(6):
-        x = random.randint(10, 90)
-        y = random.randint(10, 90)
-        size = random.randint(2, 3)
-        # Random flower colors
-        color_choice = random.randint(0, 3)
-        if color_choice == 0:
-            color = (255, 255, 255)  # White
-        elif color_choice == 1:
-            color = (255, 255, 0)    # Yellow
-        elif color_choice == 2:
-            color = (255, 200, 200)  # Light pink
-        else:
-            color = (200, 200, 255)  # Light blue
+    return {name: load_sound(name) for name in SOUND_TONES}
+
+# Sounds are loaded the first time one is needed
+sounds = None
+
+def get_sounds():
+    global sounds
+    if sounds is None:
+        sounds = timed_startup("sounds", load_sounds)
+    return sounds
+
+# Sound played for each world event
+SOUND_EVENTS = {"grow": "grow", "shrink": "shrink", "powerup": "grow", "win": "win"}
+
+def play_sound(name):
+    if sound_enabled:
+        try:
+            get_sounds()[name].play()
+        except:
+            pass
+
+# Runs asset jobs on a pool of worker threads. poll() hands each finished result to its
+# callback on the main thread, so only the main thread touches shared game state.
+class AssetLoader:
+    def __init__(self, workers=ASSET_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="assets")
+        self.pending = []
+        self.total = 0
+        self.done = 0
+        self.required_left = 0  # Unfinished jobs gameplay has to wait for
+        self.start_time = time.perf_counter()
+        self.finish_time = None
+    
+    def submit(self, name, func, args=(), callback=None, required=False):
+        future = self.executor.submit(timed_startup, name, func, *args)
+        self.pending.append((name, future, callback, required))
+        self.total += 1
+        if required:
+            self.required_left += 1
+        self.finish_time = None
+    
+    def poll(self):
+        still_pending = []
+        for job in self.pending:
+            name, future, callback, required = job
+            if not future.done():
+                still_pending.append(job)
+                continue
             
-        pygame.draw.circle(texture, color, (x, y), size)
+            # A failed job counts as done, the game falls back to making the asset on first use
+            try:
+                result = future.result()
+                if callback:
+                    callback(result)
+            except Exception as e:
+                print(f"Could not load {name}: {e}")
+            self.done += 1
+            if required:
+                self.required_left -= 1
+        self.pending = still_pending
         
-        # Add center to flower
-        center_color = (255, 220, 0)  # Yellow center
-        pygame.draw.circle(texture, center_color, (x, y), size//2)
+        if not self.pending and self.finish_time is None:
+            self.finish_time = time.perf_counter()
+    
+    def progress(self):
+        return self.done / self.total if self.total else 1.0
     
-    return texture
+    def ready(self):
+        return self.required_left == 0
+    
+    def finished(self):
+        return not self.pending
+    
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
 
-# Create grass texture
-grass_texture = create_grass_texture()
+# Loader started by main(), the start screen shows its progress
+asset_loader = None
+
+# Queue the sounds and the terrain around the player on the asset loader
+def load_assets(loader, world, audio):
+    global sounds
+    
+    # Sounds play as soon as each one is loaded, the game never waits for them
+    sounds = {}
+    if audio:
+        for name in SOUND_TONES:
+            def store_sound(sound, name=name):
+                sounds[name] = sound
+            loader.submit(f"sound {name}", load_sound, (name,), store_sound)
+    
+    # The first frame of play needs the terrain chunks around the player
+    view = Camera(world.camera.width, world.camera.height)
+    view.update(world.player.world_x, world.player.world_y)
+    first_x, first_y, last_x, last_y = terrain_chunk_range(view)
+    for chunk_x in range(first_x, last_x + 1):
+        for chunk_y in range(first_y, last_y + 1):
+            def store_chunk(chunk, key=(chunk_x, chunk_y)):
+                terrain_chunks.get(key, lambda: chunk)
+            loader.submit(f"terrain {chunk_x},{chunk_y}", render_terrain_chunk, (chunk_x, chunk_y),
+                          store_chunk, required=True)
 
 class Camera:
     def __init__(self, width, height):
         self.width = width
         self.height = height
-        self.x = 0
+        self.x = 0  # World position of the top-left corner of the view
         self.y = 0
-    
-    def update(self, target_x, target_y):
+        self.prev_x = 0
+        self.prev_y = 0
+        self.zoom = 1.0  # Screen pixels per world unit, eased toward the zoom that fits the target
+        self.prev_zoom = 1.0
+        self.scale = 1.0  # Zoom snapped to ZOOM_STEPS levels per halving, used for drawing
+        self.prev_scale = 1.0
+    
+    def save_previous(self):
+        self.prev_x = self.x
+        self.prev_y = self.y
+        self.prev_zoom = self.zoom
+        self.prev_scale = self.scale
+    
+    def interpolated(self, alpha):
+        # Camera somewhere between the previous and the current step, for drawing. The
+        # centre is interpolated so a change of zoom level doesn't shift the view.
+        view = Camera(self.width, self.height)
+        view.zoom = self.prev_zoom + (self.zoom - self.prev_zoom) * alpha
+        view.scale = view.snapped_scale()
+        prev_center_x = self.prev_x + self.width / self.prev_scale / 2
+        prev_center_y = self.prev_y + self.height / self.prev_scale / 2
+        center_x = self.x + self.width / self.scale / 2
+        center_y = self.y + self.height / self.scale / 2
+        view.x = prev_center_x + (center_x - prev_center_x) * alpha - self.width / view.scale / 2
+        view.y = prev_center_y + (center_y - prev_center_y) * alpha - self.height / view.scale / 2
+        return view
+    
+    def snapped_scale(self):
+        # Snap the zoom so sprites and terrain are only ever drawn at a few cached sizes,
+        # and never show more than a bounded world
+        scale = 2 ** (round(math.log2(self.zoom) * ZOOM_STEPS) / ZOOM_STEPS)
+        if WORLD_SIZE is not None:
+            scale = max(scale, min(1.0, max(self.width, self.height) / WORLD_SIZE))
+        return scale
+    
+    def view_size(self):
+        # Width and height of the view in world units
+        return self.width / self.scale, self.height / self.scale
+    
+    def fit_zoom(self, target_size):
+        # Zoom at which the target fills ZOOM_TARGET_FRACTION of the screen
+        fit = ZOOM_TARGET_FRACTION * min(self.width, self.height) / target_size
+        return max(MIN_ZOOM, min(1.0, fit))
+    
+    def update(self, target_x, target_y, target_size=None):
+        # Zoom out as the target grows so it keeps fitting on the screen
+        if target_size is not None:
+            self.zoom += (self.fit_zoom(target_size) - self.zoom) * ZOOM_EASING
+            self.scale = self.snapped_scale()
+        
         # Center camera on target
-        self.x = target_x - self.width // 2
-        self.y = target_y - self.height // 2
+        view_width, view_height = self.view_size()
+        self.x = target_x - view_width // 2
+        self.y = target_y - view_height // 2
         
         # Keep camera within world bounds
-        self.x = max(0, min(self.x, WORLD_SIZE - self.width))
-        self.y = max(0, min(self.y, WORLD_SIZE - self.height))
+        if WORLD_SIZE is not None:
+            self.x = max(0, min(self.x, WORLD_SIZE - view_width))
+            self.y = max(0, min(self.y, WORLD_SIZE - view_height))
+    
+    def reset(self, target_x, target_y, target_size):
+        # Jump straight to the view of the target, with nothing to ease or interpolate from
+        self.zoom = self.fit_zoom(target_size)
+        self.scale = self.snapped_scale()
+        self.update(target_x, target_y)
+        self.save_previous()
     
     def apply(self, x, y):
         # Convert world coordinates to screen coordinates
-        return int(x - self.x), int(y - self.y)
+        return int((x - self.x) * self.scale), int((y - self.y) * self.scale)
     
     def apply_rect(self, rect):
         # Convert world rect to screen rect
-        return pygame.Rect(int(rect.x - self.x), int(rect.y - self.y), rect.width, rect.height)
+        x, y = self.apply(rect.x, rect.y)
+        return pygame.Rect(x, y, int(rect.width * self.scale), int(rect.height * self.scale))
+
+# Uniform grid over world coordinates used as a collision broadphase
+class SpatialHash:
+    def __init__(self, cell_size=GRID_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}  # (cell_x, cell_y) -> {entity: None}, a dict keeps insertion order
+        self.entity_cells = {}  # entity -> (cell_x, cell_y)
+    
+    def __len__(self):
+        return len(self.entity_cells)
+    
+    def __contains__(self, entity):
+        return entity in self.entity_cells
+    
+    def cell_of(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
+    
+    def insert(self, entity, x, y):
+        cell = self.cell_of(x, y)
+        self.cells.setdefault(cell, {})[entity] = None
+        self.entity_cells[entity] = cell
+    
+    def remove(self, entity):
+        cell = self.entity_cells.pop(entity, None)
+        if cell is None:
+            return
+        bucket = self.cells[cell]
+        del bucket[entity]
+        if not bucket:
+            del self.cells[cell]
+    
+    def move(self, entity, x, y):
+        # Only touch the buckets when the entity actually crosses a cell border
+        cell = self.cell_of(x, y)
+        old_cell = self.entity_cells.get(entity)
+        if cell == old_cell:
+            return
+        if old_cell is not None:
+            self.remove(entity)
+        self.cells.setdefault(cell, {})[entity] = None
+        self.entity_cells[entity] = cell
+    
+    def clear(self):
+        self.cells.clear()
+        self.entity_cells.clear()
+    
+    def query(self, x, y, radius):
+        # Return every entity stored in a cell overlapping the square around (x, y)
+        min_x, min_y = self.cell_of(x - radius, y - radius)
+        max_x, max_y = self.cell_of(x + radius, y + radius)
+        found = []
+        
+        # A square covering more cells than are occupied is cheaper to answer from the occupied ones
+        if (max_x - min_x + 1) * (max_y - min_y + 1) > len(self.cells):
+            for (cell_x, cell_y), bucket in self.cells.items():
+                if min_x <= cell_x <= max_x and min_y <= cell_y <= max_y:
+                    found.extend(bucket)
+            return found
+        
+        for cell_x in range(min_x, max_x + 1):
+            for cell_y in range(min_y, max_y + 1):
+                bucket = self.cells.get((cell_x, cell_y))
+                if bucket:
+                    found.extend(bucket)
+        return found
+
+# Least-recently-used cache of pre-rendered surfaces, keyed by whatever describes how
+# they were drawn
+class SpriteCache:
+    def __init__(self, max_entries=SPRITE_CACHE_SIZE, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes  # Optional cap on the pixel memory of all entries
+        self.sprites = OrderedDict()
+        self.sizes = {}  # Pixel bytes per key, tracked when there is a memory cap
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+    
+    def __len__(self):
+        return len(self.sprites)
+    
+    @staticmethod
+    def entry_bytes(sprite):
+        # Entries are surfaces or (surface, anchor) pairs
+        surface = sprite[0] if isinstance(sprite, tuple) else sprite
+        return surface.get_pitch() * surface.get_height()
+    
+    def get(self, key, render):
+        sprite = self.sprites.get(key)
+        if sprite is not None:
+            self.sprites.move_to_end(key)
+            self.hits += 1
+            return sprite
+        
+        # Render on a miss and evict the oldest entries if we're over budget
+        self.misses += 1
+        sprite = render()
+        self.sprites[key] = sprite
+        if self.max_bytes is not None:
+            self.sizes[key] = SpriteCache.entry_bytes(sprite)
+            self.bytes += self.sizes[key]
+        while len(self.sprites) > self.max_entries or (self.max_bytes is not None and
+                                                       self.bytes > self.max_bytes and len(self.sprites) > 1):
+            old_key, _ = self.sprites.popitem(last=False)
+            self.bytes -= self.sizes.pop(old_key, 0)
+        return sprite
+    
+    def clear(self):
+        self.sprites.clear()
+        self.sizes.clear()
+        self.bytes = 0
+
+# Shared cache for object and power-up sprites. Entries are (surface, anchor) pairs,
+# where anchor is the pixel of the surface that sits on the entity's position.
+sprite_cache = SpriteCache(SPRITE_CACHE_SIZE, SPRITE_CACHE_BYTES)
+
+# Translucent dots for particles, keyed by (quantised radius, colour, alpha)
+dot_sprites = SpriteCache(DOT_SPRITE_CACHE_SIZE, DOT_SPRITE_CACHE_BYTES)
+
+def get_dot_sprite(radius, color, alpha):
+    key = (quantise_radius(radius), color, alpha)
+    return dot_sprites.get(key, lambda: render_dot_sprite(*key))
+
+def render_dot_sprite(radius, color, alpha):
+    surface = new_surface((radius*2, radius*2), pygame.SRCALPHA)
+    pygame.draw.circle(surface, (*color, alpha), (radius, radius), radius)
+    return surface
+
+# Translucent glows and halos keyed by (quantised radius, colour, alpha, rings)
+halo_sprites = SpriteCache(HALO_CACHE_SIZE, HALO_CACHE_BYTES)
+
+# Round a radius to one of at most 16 steps per doubling, so halos that grow smoothly
+# reuse a handful of sprites
+def quantise_radius(radius):
+    radius = max(1, int(round(radius)))
+    step = max(1, radius >> 4)
+    return max(1, (radius + step // 2) // step * step)
+
+# Draw a glow of rings ring_step pixels apart, each 30 less opaque than the one inside
+# it, centred on (x, y)
+def draw_halo(surface, x, y, radius, color, alpha, rings=1, ring_step=2):
+    radius = quantise_radius(radius)
+    if (radius * 2) ** 2 * 4 > HALO_MAX_BYTES:
+        # Too big to be worth caching: blend the rings straight onto the surface, which
+        # only touches the visible part. gfxdraw radii are 16-bit, so a ring covering the
+        # whole visible part becomes a fill and the rest are held to the diagonal.
+        bounds = surface.get_clip()
+        corner = max(math.hypot(cx - x, cy - y) for cx in (bounds.left, bounds.right) for cy in (bounds.top, bounds.bottom))
+        diagonal = int(math.hypot(bounds.width, bounds.height)) + 1
+        for i in range(rings):
+            ring = radius - i * ring_step
+            if ring >= corner:
+                pygame.gfxdraw.box(surface, bounds, (*color, alpha - i * 30))
+            else:
+                pygame.gfxdraw.filled_circle(surface, int(x), int(y), min(ring, diagonal), (*color, alpha - i * 30))
+        return pygame.Rect(int(x) - radius, int(y) - radius, radius*2 + 1, radius*2 + 1).clip(bounds)
+    key = (radius, color, alpha, rings, ring_step)
+    halo = halo_sprites.get(key, lambda: render_halo(*key))
+    return surface.blit(halo, (int(x) - radius, int(y) - radius))
+
+def render_halo(radius, color, alpha, rings, ring_step):
+    surface = new_surface((radius*2, radius*2), pygame.SRCALPHA)
+    for i in range(rings):
+        pygame.draw.circle(surface, (*color, alpha - i * 30), (radius, radius), radius - i * ring_step)
+    return surface
+
+# Fonts by size and rendered text by (text, size, colour)
+fonts = {}
+text_cache = SpriteCache(TEXT_CACHE_SIZE)
+
+def get_font(size):
+    font = fonts.get(size)
+    if font is None:
+        font = pygame.font.Font(None, size)
+        fonts[size] = font
+    return font
+
+def render_text(text, size, color):
+    return text_cache.get((text, size, color), lambda: render_new_text(text, size, color))
+
+# Render text that isn't cached yet, counting the new surface as an allocation
+def render_new_text(text, size, color):
+    global surface_allocations
+    surface_allocations += 1
+    return get_font(size).render(text, True, color)
+
+# Font sizes follow the screen size, so drop everything when it changes
+def clear_text_cache():
+    fonts.clear()
+    text_cache.clear()
+
+# Stages of one frame of the main loop, in the order they run
+FRAME_STAGES = ["events", "movement", "powerups", "objects", "collisions", "progress", "spawning",
+                "background", "draw_objects", "draw_powerups", "draw_player", "draw_ui",
+                "overlay", "present", "idle"]
+
+# Records how long each stage of each frame took in a fixed-size ring buffer. Code
+# calls mark(stage) when a stage finishes, which charges the time since the previous
+# mark to that stage, and end_frame() once the frame is over.
+class FrameProfiler:
+    def __init__(self, stages=FRAME_STAGES, history=PROFILER_HISTORY):
+        self.stages = list(stages)
+        self.stage_index = {stage: i for i, stage in enumerate(self.stages)}
+        self.history = history
+        
+        # Ring buffer, one row per frame
+        self.stage_times = np.zeros((history, len(self.stages)))
+        self.frame_times = np.zeros(history)
+        self.entity_counts = np.zeros((history, 3), dtype=np.int32)  # Objects, powerups, particles
+        self.allocations = np.zeros(history, dtype=np.int32)
+        self.frames = 0  # Frames recorded so far, the next row is frames % history
+        
+        # Accumulators for the frame in progress
+        self.current = [0.0] * len(self.stages)
+        self.frame_start = time.perf_counter()
+        self.last_mark = self.frame_start
+        self.allocations_at_start = surface_allocations
+        
+        # Overlay state
+        self.visible = False
+        self.overlay_lines = []
+    
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.current[self.stage_index[stage]] += now - self.last_mark
+        self.last_mark = now
+    
+    def end_frame(self, objects=0, powerups=0, particles=0):
+        row = self.frames % self.history
+        now = time.perf_counter()
+        self.stage_times[row] = self.current
+        self.frame_times[row] = now - self.frame_start
+        self.entity_counts[row] = (objects, powerups, particles)
+        self.allocations[row] = surface_allocations - self.allocations_at_start
+        self.frames += 1
+        
+        # Start the next frame
+        self.current = [0.0] * len(self.stages)
+        self.frame_start = now
+        self.last_mark = now
+        self.allocations_at_start = surface_allocations
+        
+        if self.visible and self.frames % PROFILER_REFRESH == 0:
+            self.overlay_lines = self.summary_lines()
+    
+    def recent_rows(self, count=None):
+        # Row indices of the most recent frames, oldest first
+        count = min(self.frames, self.history if count is None else count)
+        return (np.arange(self.frames - count, self.frames) % self.history)
+    
+    def summary_lines(self):
+        rows = self.recent_rows(FPS)
+        if len(rows) == 0:
+            return []
+        
+        frame_ms = self.frame_times[self.recent_rows()] * 1000
+        p50, p95, p99 = np.percentile(frame_ms, [50, 95, 99])
+        mean_frame = self.frame_times[rows].mean()
+        objects, powerups, particles = self.entity_counts[rows[-1]]
+        lines = [
+            f"FPS {1 / mean_frame if mean_frame > 0 else 0:5.1f}   frame p50 {p50:5.1f}  p95 {p95:5.1f}  p99 {p99:5.1f} ms",
+            f"objects {objects}  powerups {powerups}  particles {particles}",
+            f"surfaces/frame {self.allocations[rows].mean():.1f}  (max {self.allocations[rows].max()})"
+        ]
+        
+        # Average and worst time per stage over the last second
+        stage_ms = self.stage_times[rows] * 1000
+        lines.append("stage          mean   max ms")
+        for stage, mean_ms, max_ms in zip(self.stages, stage_ms.mean(axis=0), stage_ms.max(axis=0)):
+            lines.append(f"{stage:<14}{mean_ms:6.2f} {max_ms:6.2f}")
+        return lines
+    
+    def draw(self, surface):
+        if not self.overlay_lines:
+            self.overlay_lines = self.summary_lines()
+        
+        # Panel behind the text and graph
+        line_height = 16
+        graph_height = 60
+        width = 340
+        height = len(self.overlay_lines) * line_height + graph_height + 20
+        panel = surface.fill((0, 0, 0), (5, SCREEN_HEIGHT - height - 5, width, height))
+        
+        y = SCREEN_HEIGHT - height
+        for line in self.overlay_lines:
+            surface.blit(render_text(line, 18, WHITE), (10, y))
+            y += line_height
+        
+        # Frame time graph with 16.7 and 33.3 ms guide lines
+        rows = self.recent_rows(width - 10)
+        if len(rows) > 1:
+            graph_bottom = SCREEN_HEIGHT - 12
+            scale = graph_height / 50.0  # 50 ms fills the graph
+            for guide_ms, color in ((1000 / FPS, (0, 160, 0)), (2000 / FPS, (160, 160, 0))):
+                guide_y = graph_bottom - int(guide_ms * scale)
+                pygame.draw.line(surface, color, (10, guide_y), (width, guide_y))
+            heights = np.minimum(self.frame_times[rows] * 1000, 50) * scale
+            points = [(10 + i, graph_bottom - int(h)) for i, h in enumerate(heights.tolist())]
+            pygame.draw.lines(surface, (255, 120, 120), False, points)
+        return panel
+    
+    def dump(self, path):
+        # Write the ring buffer to CSV, oldest frame first
+        rows = self.recent_rows()
+        with open(path, "w") as f:
+            f.write(",".join(["frame", "frame_ms"] + [f"{stage}_ms" for stage in self.stages] +
+                             ["objects", "powerups", "particles", "surfaces"]) + "\n")
+            for frame, row in zip(range(self.frames - len(rows), self.frames), rows.tolist()):
+                values = [str(frame), f"{self.frame_times[row] * 1000:.4f}"]
+                values += [f"{t * 1000:.4f}" for t in self.stage_times[row]]
+                values += [str(v) for v in self.entity_counts[row]] + [str(self.allocations[row])]
+                f.write(",".join(values) + "\n")
+
+# Shared profiler for the main loop
+profiler = FrameProfiler()
 
 class Player:
     def __init__(self, x, y, size):
         self.world_x = x
         self.world_y = y
+        self.prev_x = x  # World position before the last step, for interpolation
+        self.prev_y = y
         self.x = x
         self.y = y
         self.size = size
@@ -300,7 +864,6 @@ class Player:
         self.speed = self.base_speed
         self.rotation = 0
         self.rotation_speed = 3
-        self.particles = []
         self.score = 0
         self.objects_collected = 0
         
@@ -317,7 +880,6 @@ class Player:
         self.growth_multiplier = 1.0
         
         # Visual effects
-        self.absorption_particles = []
         self.trail_color = BLUE
     
     def move(self, dx, dy):
@@ -336,8 +898,9 @@ class Player:
         self.world_y += self.velocity_y
         
         # Keep player within world bounds
-        self.world_x = max(self.size, min(WORLD_SIZE - self.size, self.world_x))
-        self.world_y = max(self.size, min(WORLD_SIZE - self.size, self.world_y))
+        if WORLD_SIZE is not None:
+            self.world_x = max(self.size, min(WORLD_SIZE - self.size, self.world_x))
+            self.world_y = max(self.size, min(WORLD_SIZE - self.size, self.world_y))
         
         # Rotate when moving
         if dx != 0 or dy != 0:
@@ -345,76 +908,40 @@ class Player:
             if self.rotation >= 360:
                 self.rotation = 0
     
-    def draw(self, camera):
-        # Convert world coordinates to screen coordinates
-        self.x, self.y = camera.apply(self.world_x, self.world_y)
-        
-        # Draw absorption particles
-        for particle in self.absorption_particles[:]:
-            particle['life'] -= 1
-            if particle['life'] <= 0:
-                self.absorption_particles.remove(particle)
-                continue
-                
-            # Fade out
-            alpha = int(255 * (particle['life'] / particle['max_life']))
-            color = (*particle['color'], alpha)
-            
-            # Move toward player
-            dx = self.x - particle['x']
-            dy = self.y - particle['y']
-            dist = math.sqrt(dx*dx + dy*dy)
-            if dist > 0:
-                particle['x'] += dx * 0.2
-                particle['y'] += dy * 0.2
-            
-            # Draw particle
-            s = pygame.Surface((particle['size']*2, particle['size']*2), pygame.SRCALPHA)
-            pygame.draw.circle(s, color, (particle['size'], particle['size']), particle['size'])
-            screen.blit(s, (int(particle['x'] - particle['size']), int(particle['y'] - particle['size'])))
-        
-        # Draw trail particles
-        for i, particle in enumerate(self.particles):
-            alpha = int(255 * (1 - i/len(self.particles)))
-            color = (self.trail_color[0], self.trail_color[1], self.trail_color[2], alpha)
-            s = pygame.Surface((int(particle[2]*2), int(particle[2]*2)), pygame.SRCALPHA)
-            pygame.draw.circle(s, color, (int(particle[2]), int(particle[2])), int(particle[2]))
-            screen.blit(s, (int(particle[0] - particle[2]), int(particle[1] - particle[2])))
+    def save_previous(self):
+        self.prev_x = self.world_x
+        self.prev_y = self.world_y
+    
+    def draw(self, camera, alpha=1.0):
+        # Convert the interpolated world position to screen coordinates
+        self.x, self.y = camera.apply(self.prev_x + (self.world_x - self.prev_x) * alpha,
+                                      self.prev_y + (self.world_y - self.prev_y) * alpha)
+        radius = max(1, int(self.size * camera.scale))
         
         # Draw magnet range if active
         if self.magnet_range > 0:
-            s = pygame.Surface((int(self.magnet_range*2), int(self.magnet_range*2)), pygame.SRCALPHA)
-            pygame.draw.circle(s, (255, 0, 255, 30), 
-                             (int(self.magnet_range), int(self.magnet_range)), 
-                             int(self.magnet_range))
-            screen.blit(s, (int(self.x - self.magnet_range), int(self.y - self.magnet_range)))
+            mark_dirty(draw_halo(screen, self.x, self.y, self.magnet_range * camera.scale, (255, 0, 255), 30))
         
         # Draw player with a pattern
         if self.is_invincible:
             # Draw invincibility glow
-            glow_size = self.size * 1.2
-            glow_surface = pygame.Surface((int(glow_size*2), int(glow_size*2)), pygame.SRCALPHA)
-            pygame.draw.circle(glow_surface, (0, 255, 255, 100), 
-                             (int(glow_size), int(glow_size)), int(glow_size))
-            screen.blit(glow_surface, (int(self.x - glow_size), int(self.y - glow_size)))
-        
-        # Draw player body
-        pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), int(self.size))
-        
-        # Draw stripes or pattern on player
-        for i in range(0, 360, 45):
-            angle = math.radians(i + self.rotation)
-            end_x = self.x + math.cos(angle) * self.size * 0.8
-            end_y = self.y + math.sin(angle) * self.size * 0.8
-            pygame.draw.line(screen, WHITE, (int(self.x), int(self.y)), 
-                           (int(end_x), int(end_y)), max(2, int(self.size // 10)))
-        
-        # Draw inner circle
-        pygame.draw.circle(screen, (50, 100, 255), (int(self.x), int(self.y)), int(self.size * 0.6))
+            mark_dirty(draw_halo(screen, self.x, self.y, radius * 1.2, (0, 255, 255), 100))
+        
+        # Body, stripes and inner circle come from one cached sprite per on-screen size. The
+        # stripes are 45 degrees apart, so rotations 45 degrees apart look the same. A
+        # player too big to cache is drawn directly, which only touches the visible part.
+        if radius > PLAYER_SPRITE_MAX_RADIUS:
+            draw_player_body(screen, self.color, int(self.x), int(self.y), radius, self.rotation)
+            body = pygame.Rect(int(self.x) - radius, int(self.y) - radius, radius*2 + 1, radius*2 + 1)
+            mark_dirty(body.clip(screen.get_rect()))
+        else:
+            key = ("player", self.color, radius, self.rotation % 45)
+            sprite, anchor = sprite_cache.get(key, lambda: render_player_sprite(*key[1:]))
+            mark_dirty(screen.blit(sprite, (int(self.x) - anchor[0], int(self.y) - anchor[1])))
         
         # Draw active power-up indicators
         if self.active_powerups:
-            indicator_y = self.y - self.size - 20
+            indicator_y = self.y - radius - 20
             for i, powerup in enumerate(self.active_powerups):
                 indicator_x = self.x - 30 + i * 20
                 pygame.draw.circle(screen, powerup['color'], (int(indicator_x), int(indicator_y)), 8)
@@ -424,14 +951,7 @@ class Player:
                 pygame.draw.arc(screen, WHITE, 
                               (int(indicator_x) - 10, int(indicator_y) - 10, 20, 20),
                               0, remaining * 2 * math.pi, 2)
-    
-    def update_particles(self):
-        # Add current position to particles list
-        self.particles.append((self.x, self.y, self.size * 0.5))
-        
-        # Limit number of particles
-        if len(self.particles) > 5:
-            self.particles.pop(0)
+                mark_dirty((int(indicator_x) - 10, int(indicator_y) - 10, 21, 21))
     
     def grow(self, factor=GROW_FACTOR, points=1):
         # Apply growth multiplier if active
@@ -443,19 +963,11 @@ class Player:
         
         # Adjust speed based on size (bigger = slower)
         self.speed = max(2, self.base_speed - (self.size / 20))
-        
-        # Play grow sound
-        global sound_enabled
-        if sound_enabled:
-            try:
-                sounds["grow"].play()
-            except:
-                pass
     
     def shrink(self, factor=SHRINK_FACTOR):
         # Don't shrink if invincible
         if self.is_invincible:
-            return
+            return False
             
         self.size *= factor
         # Minimum size
@@ -463,25 +975,7 @@ class Player:
         
         # Adjust speed based on size (smaller = faster)
         self.speed = max(2, self.base_speed - (self.size / 20))
-        
-        # Play shrink sound
-        global sound_enabled
-        if sound_enabled:
-            try:
-                sounds["shrink"].play()
-            except:
-                pass
-    
-    def add_absorption_particle(self, x, y, color):
-        particle = {
-            'x': x,
-            'y': y,
-            'color': color,
-            'size': random.randint(2, 5),
-            'life': random.randint(15, 30),
-            'max_life': 30
-        }
-        self.absorption_particles.append(particle)
+        return True
     
     def apply_powerup(self, powerup):
         effect = {
@@ -502,18 +996,10 @@ class Player:
             self.is_invincible = True
         elif powerup.name == "growth":
             self.growth_multiplier = 1.5
-        
-        # Play power-up sound
-        global sound_enabled
-        if sound_enabled:
-            try:
-                sounds["grow"].play()  # Reuse grow sound for now
-            except:
-                pass
     
-    def update_powerups(self):
+    def update_powerups(self, dt=SIM_DT):
         for powerup in self.active_powerups[:]:
-            powerup['time_left'] -= 1/60  # Assuming 60 FPS
+            powerup['time_left'] -= dt
             
             if powerup['time_left'] <= 0:
                 # Remove effect
@@ -529,6 +1015,25 @@ class Player:
                 
                 self.active_powerups.remove(powerup)
 
+# Render the player's body with its stripes, turned by rotation degrees
+def render_player_sprite(color, radius, rotation):
+    surface = new_surface((radius * 2 + 1, radius * 2 + 1), pygame.SRCALPHA)
+    draw_player_body(surface, color, radius, radius, radius, rotation)
+    return surface, (radius, radius)
+
+def draw_player_body(surface, color, x, y, radius, rotation):
+    pygame.draw.circle(surface, color, (x, y), radius)
+    
+    # Draw stripes or pattern on player
+    for i in range(0, 360, 45):
+        angle = math.radians(i + rotation)
+        end_x = x + math.cos(angle) * radius * 0.8
+        end_y = y + math.sin(angle) * radius * 0.8
+        pygame.draw.line(surface, WHITE, (x, y), (int(end_x), int(end_y)), max(2, int(radius // 10)))
+    
+    # Draw inner circle
+    pygame.draw.circle(surface, (50, 100, 255), (x, y), int(radius * 0.6))
+
 class Object:
     TYPES = [
         {"name": "rabbit", "color": (200, 200, 200), "shape": "circle", "points": 2},
@@ -543,525 +1048,1447 @@ class Object:
         {"name": "fish", "color": (0, 191, 255), "shape": "circle", "points": 2}
     ]
     
-    def __init__(self, x, y, size):
-        self.world_x = x
-        self.world_y = y
-        self.x = x  # Screen coordinates, will be updated by camera
-        self.y = y
-        self.size = size
-        self.bounce = 0
-        self.bounce_dir = 1
-        self.rotation = random.randint(0, 360)
+    # An Object is a read-only view of one slot in an ObjectStore
+    def __init__(self, store, slot):
+        self.store = store
+        self.slot = slot
+        self.world_x = float(store.world_x[slot])
+        self.world_y = float(store.world_y[slot])
+        self.x = int(store.screen_x[slot])  # Screen coordinates, filled in by ObjectStore.apply_camera
+        self.y = int(store.screen_y[slot])
+        self.size = float(store.size[slot])
+        self.bounce = float(store.bounce[slot])
+        self.rotation = float(store.rotation[slot])
         
-        # Choose a random object type
-        self.type = random.choice(Object.TYPES)
+        # Look up the shared type data
+        self.type = Object.TYPES[store.type_id[slot]]
         self.color = self.type["color"]
         self.shape = self.type["shape"]
         self.name = self.type["name"]
         self.points = self.type["points"]
         
         # Animation variables
-        self.anim_offset = random.randint(0, 100)
-        self.anim_speed = random.uniform(0.02, 0.05)
+        self.anim_offset = float(store.anim_offset[slot])
+        self.anim_speed = float(store.anim_speed[slot])
+
+# Draw one object centred on (x, y). Animated parts (wings, tails) use the given
+# phase in radians, so the result can be baked into a sprite.
+def draw_object_shape(surface, name, color, x, y, size, rotation, phase, spot_rng):
+    if name == "rabbit":
+        # Draw body
+        pygame.draw.circle(surface, color, (int(x), int(y)), int(size))
+        
+        # Draw ears
+        ear_size = size * 0.4
+        pygame.draw.ellipse(surface, color, 
+                          (int(x - ear_size/2 - size/2), 
+                           int(y - ear_size*1.5), 
+                           int(ear_size), int(ear_size*1.5)))
+        pygame.draw.ellipse(surface, color, 
+                          (int(x - ear_size/2 + size/2), 
+                           int(y - ear_size*1.5), 
+                           int(ear_size), int(ear_size*1.5)))
+        
+        # Draw eyes
+        eye_size = max(2, int(size * 0.15))
+        pygame.draw.circle(surface, BLACK, 
+                         (int(x - size*0.3), int(y - size*0.2)), 
+                         eye_size)
+        pygame.draw.circle(surface, BLACK, 
+                         (int(x + size*0.3), int(y - size*0.2)), 
+                         eye_size)
+        
+    elif name == "stone":
+        # Draw stone with texture
+        pygame.draw.circle(surface, color, (int(x), int(y)), int(size))
+        
+        # Add texture lines
+        for i in range(3):
+            angle = math.radians(rotation + i * 120)
+            x1 = x + math.cos(angle) * size * 0.5
+            y1 = y + math.sin(angle) * size * 0.5
+            x2 = x + math.cos(angle + math.pi/4) * size * 0.7
+            y2 = y + math.sin(angle + math.pi/4) * size * 0.7
+            pygame.draw.line(surface, (100, 100, 100), 
+                           (int(x1), int(y1)), 
+                           (int(x2), int(y2)), 
+                           max(1, int(size/10)))
+        
+    elif name == "mushroom":
+        # Draw cap
+        pygame.draw.circle(surface, color, (int(x), int(y - size*0.2)), int(size))
+        
+        # Draw stem
+        stem_width = size * 0.6
+        stem_height = size * 0.8
+        pygame.draw.rect(surface, WHITE, 
+                       (int(x - stem_width/2), 
+                        int(y), 
+                        int(stem_width), int(stem_height)))
+        
+        # Draw spots
+        for _ in range(3):
+            spot_x = x + spot_rng.uniform(-0.6, 0.6) * size
+            spot_y = y - size*0.2 + spot_rng.uniform(-0.6, 0.6) * size
+            spot_size = size * 0.15
+            pygame.draw.circle(surface, WHITE, (int(spot_x), int(spot_y)), int(spot_size))
+        
+    elif name == "flower":
+        # Draw center
+        pygame.draw.circle(surface, YELLOW, (int(x), int(y)), int(size * 0.3))
+        
+        # Draw petals
+        for angle in range(0, 360, 45):
+            rad = math.radians(angle + rotation)
+            petal_x = x + math.cos(rad) * size * 0.7
+            petal_y = y + math.sin(rad) * size * 0.7
+            pygame.draw.circle(surface, color, (int(petal_x), int(petal_y)), int(size * 0.4))
+        
+        # Draw stem
+        pygame.draw.line(surface, GREEN, 
+                       (int(x), int(y + size*0.3)), 
+                       (int(x), int(y + size*1.2)), 
+                       max(2, int(size/10)))
+        
+    elif name == "bush":
+        # Draw multiple circles for bush
+        for i in range(5):
+            offset_x = math.cos(math.radians(i * 72 + rotation)) * size * 0.5
+            offset_y = math.sin(math.radians(i * 72 + rotation)) * size * 0.5
+            pygame.draw.circle(surface, color, 
+                             (int(x + offset_x), int(y + offset_y)), 
+                             int(size * 0.6))
+        
+        # Draw main bush body
+        pygame.draw.circle(surface, color, (int(x), int(y)), int(size * 0.7))
+        
+    elif name == "butterfly":
+        # Draw body
+        pygame.draw.line(surface, BLACK, 
+                       (int(x), int(y - size*0.5)), 
+                       (int(x), int(y + size*0.5)), 
+                       max(2, int(size/8)))
+        
+        # Draw wings with animation
+        wing_flutter = math.sin(phase) * 0.5 + 0.5
+        wing_size_x = size * (0.8 + wing_flutter * 0.3)
+        wing_size_y = size * 0.7
+        
+        # Left wing
+        pygame.draw.ellipse(surface, color, 
+                          (int(x - wing_size_x), 
+                           int(y - wing_size_y/2), 
+                           int(wing_size_x), int(wing_size_y)))
+        
+        # Right wing
+        pygame.draw.ellipse(surface, color, 
+                          (int(x), 
+                           int(y - wing_size_y/2), 
+                           int(wing_size_x), int(wing_size_y)))
+        
+        # Wing patterns
+        pattern_color = (255, 255, 255, 150)
+        s = new_surface((int(wing_size_x*0.7), int(wing_size_y*0.7)), pygame.SRCALPHA)
+        pygame.draw.ellipse(s, pattern_color, 
+                          (0, 0, int(wing_size_x*0.7), int(wing_size_y*0.7)))
+        
+        surface.blit(s, (int(x - wing_size_x*0.8), int(y - wing_size_y*0.35)))
+        surface.blit(s, (int(x + wing_size_x*0.1), int(y - wing_size_y*0.35)))
+        
+    elif name == "frog":
+        # Draw body
+        pygame.draw.circle(surface, color, (int(x), int(y)), int(size))
+        
+        # Draw eyes
+        eye_size = max(2, int(size * 0.25))
+        pygame.draw.circle(surface, WHITE, 
+                         (int(x - size*0.3), int(y - size*0.4)), 
+                         eye_size)
+        pygame.draw.circle(surface, WHITE, 
+                         (int(x + size*0.3), int(y - size*0.4)), 
+                         eye_size)
+        
+        # Draw pupils
+        pupil_size = max(1, int(eye_size * 0.5))
+        pygame.draw.circle(surface, BLACK, 
+                         (int(x - size*0.3), int(y - size*0.4)), 
+                         pupil_size)
+        pygame.draw.circle(surface, BLACK, 
+                         (int(x + size*0.3), int(y - size*0.4)), 
+                         pupil_size)
+        
+        # Draw mouth
+        pygame.draw.arc(surface, (50, 100, 50), 
+                      (int(x - size*0.5), int(y - size*0.1), 
+                       int(size), int(size*0.5)), 
+                      0, math.pi, max(1, int(size/10)))
+        
+    elif name == "bird":
+        # Draw body
+        pygame.draw.circle(surface, color, (int(x), int(y)), int(size * 0.8))
+        
+        # Draw head
+        pygame.draw.circle(surface, color, 
+                         (int(x + size*0.5), int(y - size*0.3)), 
+                         int(size * 0.5))
+        
+        # Draw beak
+        beak_points = [
+            (x + size*0.9, y - size*0.3),
+            (x + size*1.2, y - size*0.2),
+            (x + size*0.9, y - size*0.1)
+        ]
+        pygame.draw.polygon(surface, ORANGE, [(int(x), int(y)) for x, y in beak_points])
+        
+        # Draw eye
+        pygame.draw.circle(surface, BLACK, 
+                         (int(x + size*0.6), int(y - size*0.4)), 
+                         max(2, int(size * 0.1)))
+        
+        # Draw wing
+        wing_y_offset = math.sin(phase) * 3
+        wing_points = [
+            (x - size*0.1, y - size*0.1),
+            (x - size*0.8, y - size*0.5 + wing_y_offset),
+            (x - size*0.2, y + size*0.3)
+        ]
+        pygame.draw.polygon(surface, color, [(int(x), int(y)) for x, y in wing_points])
+        
+    elif name == "squirrel":
+        # Draw body
+        pygame.draw.circle(surface, color, (int(x), int(y)), int(size))
+        
+        # Draw head
+        pygame.draw.circle(surface, color, 
+                         (int(x + size*0.5), int(y - size*0.3)), 
+                         int(size * 0.6))
+        
+        # Draw tail
+        tail_points = [
+            (x - size*0.3, y),
+            (x - size*0.8, y - size*0.8),
+            (x - size*1.2, y - size*0.5),
+            (x - size*0.9, y)
+        ]
+        pygame.draw.polygon(surface, color, [(int(x), int(y)) for x, y in tail_points])
+        
+        # Draw eye
+        pygame.draw.circle(surface, BLACK, 
+                         (int(x + size*0.7), int(y - size*0.4)), 
+                         max(2, int(size * 0.1)))
+        
+        # Draw ear
+        pygame.draw.circle(surface, color, 
+                         (int(x + size*0.7), int(y - size*0.8)), 
+                         int(size * 0.2))
+        
+    elif name == "fish":
+        # Draw body
+        body_points = [
+            (x + size*0.8, y),
+            (x - size*0.5, y - size*0.5),
+            (x - size*0.5, y + size*0.5)
+        ]
+        pygame.draw.polygon(surface, color, [(int(x), int(y)) for x, y in body_points])
+        
+        # Draw tail with animation
+        tail_wave = math.sin(phase) * 0.3
+        tail_points = [
+            (x - size*0.5, y - size*0.3),
+            (x - size*1.0, y + tail_wave),
+            (x - size*0.5, y + size*0.3)
+        ]
+        pygame.draw.polygon(surface, color, [(int(x), int(y)) for x, y in tail_points])
+        
+        # Draw eye
+        pygame.draw.circle(surface, BLACK, 
+                         (int(x + size*0.4), int(y - size*0.1)), 
+                         max(2, int(size * 0.15)))
+        
+        # Draw fin
+        fin_points = [
+            (x, y - size*0.1),
+            (x + size*0.3, y - size*0.6),
+            (x + size*0.5, y - size*0.1)
+        ]
+        pygame.draw.polygon(surface, color, [(int(x), int(y)) for x, y in fin_points])
+
+# Cheaper stand-in for draw_object_shape at small sizes: the body in one colour with the
+# outline features that tell the types apart, no eyes, texture, rotation or animation
+def draw_object_silhouette(surface, name, color, x, y, size):
+    x, y = int(x), int(y)
+    if name == "rabbit":
+        pygame.draw.circle(surface, color, (x, y), int(size))
+        ear_size = size * 0.4
+        for ear_x in (x - size/2, x + size/2):
+            pygame.draw.ellipse(surface, color, (int(ear_x - ear_size/2), int(y - ear_size*1.5),
+                                                 int(ear_size), int(ear_size*1.5)))
+    elif name == "mushroom":
+        pygame.draw.circle(surface, color, (x, int(y - size*0.2)), int(size))
+        pygame.draw.rect(surface, WHITE, (int(x - size*0.3), y, int(size*0.6), int(size*0.8)))
+    elif name == "flower":
+        pygame.draw.circle(surface, color, (x, y), int(size * 1.1))
+        pygame.draw.circle(surface, YELLOW, (x, y), int(size * 0.3))
+        pygame.draw.line(surface, GREEN, (x, int(y + size*0.3)), (x, int(y + size*1.2)), max(1, int(size/10)))
+    elif name == "butterfly":
+        pygame.draw.ellipse(surface, color, (int(x - size), int(y - size*0.35), int(size*2), int(size*0.7)))
+    elif name == "bird":
+        pygame.draw.circle(surface, color, (x, y), int(size * 0.8))
+        pygame.draw.circle(surface, color, (int(x + size*0.5), int(y - size*0.3)), int(size * 0.5))
+    elif name == "squirrel":
+        pygame.draw.circle(surface, color, (x, y), int(size))
+        pygame.draw.polygon(surface, color, [(int(x - size*0.3), y), (int(x - size*0.8), int(y - size*0.8)),
+                                             (int(x - size*1.2), int(y - size*0.5)), (int(x - size*0.9), y)])
+    elif name == "fish":
+        pygame.draw.polygon(surface, color, [(int(x + size*0.8), y), (int(x - size*0.5), int(y - size*0.5)),
+                                             (int(x - size*0.5), int(y + size*0.5))])
+        pygame.draw.polygon(surface, color, [(int(x - size*0.5), int(y - size*0.3)), (int(x - size), y),
+                                             (int(x - size*0.5), int(y + size*0.3))])
+    else:
+        # Stones, bushes and frogs are round
+        pygame.draw.circle(surface, color, (x, y), int(size))
+
+# Structure-of-arrays storage for every object in the world. Slots are stable ids:
+# removed slots go on a free list and are reused by later spawns.
+class ObjectStore:
+    FIELDS = [
+        ("world_x", np.float64), ("world_y", np.float64), ("size", np.float64),
+        ("type_id", np.int16), ("points", np.int32),
+        ("bounce", np.float64), ("bounce_dir", np.float64), ("rotation", np.float64),
+        ("anim_offset", np.float64), ("anim_speed", np.float64),
+        ("prev_x", np.float64), ("prev_y", np.float64),
+        ("screen_x", np.int32), ("screen_y", np.int32), ("alive", np.bool_)
+    ]
+    TYPE_POINTS = np.array([t["points"] for t in Object.TYPES], dtype=np.int32)
+    # Degrees after which a shape looks the same again (0 = not drawn rotated)
+    TYPE_ROTATION_PERIOD = np.array([{"stone": 120, "bush": 72, "flower": 45}.get(t["name"], 0)
+                                     for t in Object.TYPES], dtype=np.float64)
+    # Wing/tail animation speed in radians per millisecond (0 = not animated)
+    TYPE_ANIM_RATE = np.array([{"butterfly": 0.01, "bird": 0.005, "fish": 0.01}.get(t["name"], 0)
+                               for t in Object.TYPES], dtype=np.float64)
+    # Stones sit still, everything else bobs up and down
+    TYPE_BOBS = np.array([t["name"] != "stone" for t in Object.TYPES])
+    # Fields that describe an object, as opposed to per-step scratch values
+    SAVED_FIELDS = ["world_x", "world_y", "size", "type_id", "points", "bounce", "bounce_dir", "rotation",
+                    "anim_offset", "anim_speed"]
+    
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        for name, dtype in ObjectStore.FIELDS:
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+        self.free_slots = []
+        self.high_water = 0  # Slots at or above this index have never been used
+        self.count = 0
+        self.grid = SpatialHash()
+    
+    def __len__(self):
+        return self.count
+    
+    def _grow(self):
+        # Double every array, keeping the existing slots in place
+        new_capacity = self.capacity * 2
+        for name, dtype in ObjectStore.FIELDS:
+            array = np.zeros(new_capacity, dtype=dtype)
+            array[:self.capacity] = getattr(self, name)
+            setattr(self, name, array)
+        self.capacity = new_capacity
+    
+    def _allocate(self):
+        if self.free_slots:
+            return self.free_slots.pop()
+        if self.high_water == self.capacity:
+            self._grow()
+        self.high_water += 1
+        return self.high_water - 1
+    
+    def spawn(self, x, y, size, rng=None):
+        rng = world_rng if rng is None else rng
+        slot = self._allocate()
+        
+        self.world_x[slot] = x
+        self.world_y[slot] = y
+        self.prev_x[slot] = x
+        self.prev_y[slot] = y
+        self.size[slot] = size
+        self.bounce[slot] = 0
+        self.bounce_dir[slot] = 1
+        self.rotation[slot] = rng.randint(0, 360)
+        
+        # Choose a random object type
+        type_id = rng.randrange(len(Object.TYPES))
+        self.type_id[slot] = type_id
+        self.points[slot] = ObjectStore.TYPE_POINTS[type_id]
+        
+        # Animation variables
+        self.anim_offset[slot] = rng.randint(0, 100)
+        self.anim_speed[slot] = rng.uniform(0.02, 0.05)
+        
+        self.alive[slot] = True
+        self.count += 1
+        self.grid.insert(slot, x, y)
+        return slot
+    
+    def export(self, slots):
+        # Copy out the given objects as arrays that restore() can bring back
+        slots = np.asarray(slots, dtype=np.intp)
+        return {name: getattr(self, name)[slots].copy() for name in ObjectStore.SAVED_FIELDS}
+    
+    def restore(self, state):
+        # Spawn objects exactly as export() saw them
+        slots = np.array([self._allocate() for _ in range(len(state["world_x"]))], dtype=np.intp)
+        for name in ObjectStore.SAVED_FIELDS:
+            getattr(self, name)[slots] = state[name]
+        self.prev_x[slots] = state["world_x"]
+        self.prev_y[slots] = state["world_y"]
+        self.alive[slots] = True
+        self.count += len(slots)
+        for slot, x, y in zip(slots.tolist(), state["world_x"].tolist(), state["world_y"].tolist()):
+            self.grid.insert(slot, x, y)
+        return slots
+    
+    def remove(self, slots):
+        slots = np.asarray(slots, dtype=np.intp)
+        self.alive[slots] = False
+        self.count -= len(slots)
+        for slot in slots.tolist():
+            self.grid.remove(slot)
+            self.free_slots.append(slot)
+    
+    def live_slots(self):
+        return np.flatnonzero(self.alive[:self.high_water])
+    
+    def get(self, slot):
+        return Object(self, slot)
+    
+    def save_previous(self):
+        # Remember positions before a step so drawing can interpolate
+        n = self.high_water
+        self.prev_x[:n] = self.world_x[:n]
+        self.prev_y[:n] = self.world_y[:n]
     
     def update(self):
-        # Simple animation
-        self.bounce += 0.1 * self.bounce_dir
-        if abs(self.bounce) > 3:
-            self.bounce_dir *= -1
+        # Simple animation for the whole population at once
+        n = self.high_water
+        bounce = self.bounce[:n]
+        bounce_dir = self.bounce_dir[:n]
+        bounce += 0.1 * bounce_dir
+        bounce_dir[np.abs(bounce) > 3] *= -1
         
         # Rotate slowly
-        self.rotation = (self.rotation + 0.5) % 360
-    
-    def draw(self, camera):
-        # Convert world coordinates to screen coordinates
-        self.x, self.y = camera.apply(self.world_x, self.world_y)
+        rotation = self.rotation[:n]
+        rotation += 0.5
+        rotation %= 360
+    
+    def move(self, slots, new_x, new_y):
+        # Write back new positions and keep the collision grid in sync
+        self.world_x[slots] = new_x
+        self.world_y[slots] = new_y
+        for slot, x, y in zip(slots.tolist(), new_x.tolist(), new_y.tolist()):
+            self.grid.move(slot, x, y)
+    
+    def apply_magnets(self, attractors):
+        # Pull every object inside the range of an (x, y, magnet_range, max_size) attractor
+        # and smaller than max_size toward it. Only objects in the grid cells around each
+        # attractor are looked at, and pulls from overlapping attractors add up.
+        slot_arrays = []
+        owner_arrays = []
+        for index, (x, y, magnet_range, _) in enumerate(attractors):
+            candidates = self.grid.query(x, y, magnet_range)
+            slot_arrays.append(np.fromiter(candidates, dtype=np.intp, count=len(candidates)))
+            owner_arrays.append(np.full(len(candidates), index, dtype=np.intp))
+        slots = np.concatenate(slot_arrays) if slot_arrays else np.empty(0, dtype=np.intp)
+        if len(slots) == 0:
+            return
+        owners = np.concatenate(owner_arrays)
+        target_x, target_y, magnet_range, max_size = np.array(attractors, dtype=np.float64)[owners].T
         
-        # Only draw if on screen (with a small buffer)
-        if (-self.size*2 <= self.x <= SCREEN_WIDTH + self.size*2 and
-            -self.size*2 <= self.y <= SCREEN_HEIGHT + self.size*2):
-            
-            # Apply bounce animation
-            y_offset = math.sin(pygame.time.get_ticks() * self.anim_speed + self.anim_offset) * 3
-            
-            if self.name == "rabbit":
-                # Draw body
-                pygame.draw.circle(screen, self.color, (int(self.x), int(self.y + y_offset)), int(self.size))
-                
-                # Draw ears
-                ear_size = self.size * 0.4
-                pygame.draw.ellipse(screen, self.color, 
-                                  (int(self.x - ear_size/2 - self.size/2), 
-                                   int(self.y - ear_size*1.5 + y_offset), 
-                                   int(ear_size), int(ear_size*1.5)))
-                pygame.draw.ellipse(screen, self.color, 
-                                  (int(self.x - ear_size/2 + self.size/2), 
-                                   int(self.y - ear_size*1.5 + y_offset), 
-                                   int(ear_size), int(ear_size*1.5)))
-                
-                # Draw eyes
-                eye_size = max(2, int(self.size * 0.15))
-                pygame.draw.circle(screen, BLACK, 
-                                 (int(self.x - self.size*0.3), int(self.y - self.size*0.2 + y_offset)), 
-                                 eye_size)
-                pygame.draw.circle(screen, BLACK, 
-                                 (int(self.x + self.size*0.3), int(self.y - self.size*0.2 + y_offset)), 
-                                 eye_size)
-                
-            elif self.name == "stone":
-                # Draw stone with texture
-                pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), int(self.size))
-                
-                # Add texture lines
-                for i in range(3):
-                    angle = math.radians(self.rotation + i * 120)
-                    x1 = self.x + math.cos(angle) * self.size * 0.5
-                    y1 = self.y + math.sin(angle) * self.size * 0.5
-                    x2 = self.x + math.cos(angle + math.pi/4) * self.size * 0.7
-                    y2 = self.y + math.sin(angle + math.pi/4) * self.size * 0.7
-                    pygame.draw.line(screen, (100, 100, 100), 
-                                   (int(x1), int(y1)), 
-                                   (int(x2), int(y2)), 
-                                   max(1, int(self.size/10)))
-                
-            elif self.name == "mushroom":
-                # Draw cap
-                pygame.draw.circle(screen, self.color, (int(self.x), int(self.y - self.size*0.2 + y_offset)), int(self.size))
-                
-                # Draw stem
-                stem_width = self.size * 0.6
-                stem_height = self.size * 0.8
-                pygame.draw.rect(screen, WHITE, 
-                               (int(self.x - stem_width/2), 
-                                int(self.y + y_offset), 
-                                int(stem_width), int(stem_height)))
-                
-                # Draw spots
-                for _ in range(3):
-                    spot_x = self.x + random.uniform(-0.6, 0.6) * self.size
-                    spot_y = self.y - self.size*0.2 + random.uniform(-0.6, 0.6) * self.size + y_offset
-                    spot_size = self.size * 0.15
-                    pygame.draw.circle(screen, WHITE, (int(spot_x), int(spot_y)), int(spot_size))
-                
-            elif self.name == "flower":
-                # Draw center
-                pygame.draw.circle(screen, YELLOW, (int(self.x), int(self.y + y_offset)), int(self.size * 0.3))
-                
-                # Draw petals
-                for angle in range(0, 360, 45):
-                    rad = math.radians(angle + self.rotation)
-                    petal_x = self.x + math.cos(rad) * self.size * 0.7
-                    petal_y = self.y + math.sin(rad) * self.size * 0.7 + y_offset
-                    pygame.draw.circle(screen, self.color, (int(petal_x), int(petal_y)), int(self.size * 0.4))
-                
-                # Draw stem
-                pygame.draw.line(screen, GREEN, 
-                               (int(self.x), int(self.y + self.size*0.3 + y_offset)), 
-                               (int(self.x), int(self.y + self.size*1.2 + y_offset)), 
-                               max(2, int(self.size/10)))
-                
-            elif self.name == "bush":
-                # Draw multiple circles for bush
-                for i in range(5):
-                    offset_x = math.cos(math.radians(i * 72 + self.rotation)) * self.size * 0.5
-                    offset_y = math.sin(math.radians(i * 72 + self.rotation)) * self.size * 0.5
-                    pygame.draw.circle(screen, self.color, 
-                                     (int(self.x + offset_x), int(self.y + offset_y + y_offset)), 
-                                     int(self.size * 0.6))
-                
-                # Draw main bush body
-                pygame.draw.circle(screen, self.color, (int(self.x), int(self.y + y_offset)), int(self.size * 0.7))
-                
-            elif self.name == "butterfly":
-                # Draw body
-                pygame.draw.line(screen, BLACK, 
-                               (int(self.x), int(self.y - self.size*0.5 + y_offset)), 
-                               (int(self.x), int(self.y + self.size*0.5 + y_offset)), 
-                               max(2, int(self.size/8)))
-                
-                # Draw wings with animation
-                wing_flutter = math.sin(pygame.time.get_ticks() * 0.01 + self.anim_offset) * 0.5 + 0.5
-                wing_size_x = self.size * (0.8 + wing_flutter * 0.3)
-                wing_size_y = self.size * 0.7
-                
-                # Left wing
-                pygame.draw.ellipse(screen, self.color, 
-                                  (int(self.x - wing_size_x), 
-                                   int(self.y - wing_size_y/2 + y_offset), 
-                                   int(wing_size_x), int(wing_size_y)))
-                
-                # Right wing
-                pygame.draw.ellipse(screen, self.color, 
-                                  (int(self.x), 
-                                   int(self.y - wing_size_y/2 + y_offset), 
-                                   int(wing_size_x), int(wing_size_y)))
-                
-                # Wing patterns
-                pattern_color = (255, 255, 255, 150)
-                s = pygame.Surface((int(wing_size_x*0.7), int(wing_size_y*0.7)), pygame.SRCALPHA)
-                pygame.draw.ellipse(s, pattern_color, 
-                                  (0, 0, int(wing_size_x*0.7), int(wing_size_y*0.7)))
-                
-                screen.blit(s, (int(self.x - wing_size_x*0.8), int(self.y - wing_size_y*0.35 + y_offset)))
-                screen.blit(s, (int(self.x + wing_size_x*0.1), int(self.y - wing_size_y*0.35 + y_offset)))
-                
-            elif self.name == "frog":
-                # Draw body
-                pygame.draw.circle(screen, self.color, (int(self.x), int(self.y + y_offset)), int(self.size))
-                
-                # Draw eyes
-                eye_size = max(2, int(self.size * 0.25))
-                pygame.draw.circle(screen, WHITE, 
-                                 (int(self.x - self.size*0.3), int(self.y - self.size*0.4 + y_offset)), 
-                                 eye_size)
-                pygame.draw.circle(screen, WHITE, 
-                                 (int(self.x + self.size*0.3), int(self.y - self.size*0.4 + y_offset)), 
-                                 eye_size)
-                
-                # Draw pupils
-                pupil_size = max(1, int(eye_size * 0.5))
-                pygame.draw.circle(screen, BLACK, 
-                                 (int(self.x - self.size*0.3), int(self.y - self.size*0.4 + y_offset)), 
-                                 pupil_size)
-                pygame.draw.circle(screen, BLACK, 
-                                 (int(self.x + self.size*0.3), int(self.y - self.size*0.4 + y_offset)), 
-                                 pupil_size)
-                
-                # Draw mouth
-                pygame.draw.arc(screen, (50, 100, 50), 
-                              (int(self.x - self.size*0.5), int(self.y - self.size*0.1 + y_offset), 
-                               int(self.size), int(self.size*0.5)), 
-                              0, math.pi, max(1, int(self.size/10)))
-                
-            elif self.name == "bird":
-                # Draw body
-                pygame.draw.circle(screen, self.color, (int(self.x), int(self.y + y_offset)), int(self.size * 0.8))
-                
-                # Draw head
-                pygame.draw.circle(screen, self.color, 
-                                 (int(self.x + self.size*0.5), int(self.y - self.size*0.3 + y_offset)), 
-                                 int(self.size * 0.5))
-                
-                # Draw beak
-                beak_points = [
-                    (self.x + self.size*0.9, self.y - self.size*0.3 + y_offset),
-                    (self.x + self.size*1.2, self.y - self.size*0.2 + y_offset),
-                    (self.x + self.size*0.9, self.y - self.size*0.1 + y_offset)
-                ]
-                pygame.draw.polygon(screen, ORANGE, [(int(x), int(y)) for x, y in beak_points])
-                
-                # Draw eye
-                pygame.draw.circle(screen, BLACK, 
-                                 (int(self.x + self.size*0.6), int(self.y - self.size*0.4 + y_offset)), 
-                                 max(2, int(self.size * 0.1)))
-                
-                # Draw wing
-                wing_y_offset = math.sin(pygame.time.get_ticks() * 0.005 + self.anim_offset) * 3
-                wing_points = [
-                    (self.x - self.size*0.1, self.y - self.size*0.1 + y_offset),
-                    (self.x - self.size*0.8, self.y - self.size*0.5 + wing_y_offset + y_offset),
-                    (self.x - self.size*0.2, self.y + self.size*0.3 + y_offset)
-                ]
-                pygame.draw.polygon(screen, self.color, [(int(x), int(y)) for x, y in wing_points])
-                
-            elif self.name == "squirrel":
-                # Draw body
-                pygame.draw.circle(screen, self.color, (int(self.x), int(self.y + y_offset)), int(self.size))
-                
-                # Draw head
-                pygame.draw.circle(screen, self.color, 
-                                 (int(self.x + self.size*0.5), int(self.y - self.size*0.3 + y_offset)), 
-                                 int(self.size * 0.6))
-                
-                # Draw tail
-                tail_points = [
-                    (self.x - self.size*0.3, self.y + y_offset),
-                    (self.x - self.size*0.8, self.y - self.size*0.8 + y_offset),
-                    (self.x - self.size*1.2, self.y - self.size*0.5 + y_offset),
-                    (self.x - self.size*0.9, self.y + y_offset)
-                ]
-                pygame.draw.polygon(screen, self.color, [(int(x), int(y)) for x, y in tail_points])
-                
-                # Draw eye
-                pygame.draw.circle(screen, BLACK, 
-                                 (int(self.x + self.size*0.7), int(self.y - self.size*0.4 + y_offset)), 
-                                 max(2, int(self.size * 0.1)))
-                
-                # Draw ear
-                pygame.draw.circle(screen, self.color, 
-                                 (int(self.x + self.size*0.7), int(self.y - self.size*0.8 + y_offset)), 
-                                 int(self.size * 0.2))
-                
-            elif self.name == "fish":
-                # Draw body
-                body_points = [
-                    (self.x + self.size*0.8, self.y + y_offset),
-                    (self.x - self.size*0.5, self.y - self.size*0.5 + y_offset),
-                    (self.x - self.size*0.5, self.y + self.size*0.5 + y_offset)
-                ]
-                pygame.draw.polygon(screen, self.color, [(int(x), int(y)) for x, y in body_points])
-                
-                # Draw tail with animation
-                tail_wave = math.sin(pygame.time.get_ticks() * 0.01 + self.anim_offset) * 0.3
-                tail_points = [
-                    (self.x - self.size*0.5, self.y - self.size*0.3 + y_offset),
-                    (self.x - self.size*1.0, self.y + tail_wave + y_offset),
-                    (self.x - self.size*0.5, self.y + self.size*0.3 + y_offset)
-                ]
-                pygame.draw.polygon(screen, self.color, [(int(x), int(y)) for x, y in tail_points])
-                
-                # Draw eye
-                pygame.draw.circle(screen, BLACK, 
-                                 (int(self.x + self.size*0.4), int(self.y - self.size*0.1 + y_offset)), 
-                                 max(2, int(self.size * 0.15)))
+        dx = target_x - self.world_x[slots]
+        dy = target_y - self.world_y[slots]
+        dist = np.sqrt(dx * dx + dy * dy)
+        pulled = (dist < magnet_range) & (self.size[slots] < max_size)
+        if not pulled.any():
+            return
+        slots, dx, dy, dist, magnet_range = slots[pulled], dx[pulled], dy[pulled], dist[pulled], magnet_range[pulled]
+        
+        # Normalize, leaving objects sitting exactly on the target alone
+        safe_dist = np.where(dist > 0, dist, 1)
+        pull_strength = 2 * (1 - dist / magnet_range)
+        
+        # Sum the pulls on each object and move it once
+        moved, pull_index = np.unique(slots, return_inverse=True)
+        pull_x = np.bincount(pull_index, weights=dx / safe_dist * pull_strength, minlength=len(moved))
+        pull_y = np.bincount(pull_index, weights=dy / safe_dist * pull_strength, minlength=len(moved))
+        self.move(moved, self.world_x[moved] + pull_x, self.world_y[moved] + pull_y)
+    
+    def colliding(self, x, y, radius):
+        # Slots whose circle overlaps the given circle, using the grid as broadphase
+        candidates = np.fromiter(self.grid.query(x, y, radius + OBJECT_MAX_SIZE), dtype=np.intp)
+        if len(candidates) == 0:
+            return candidates
+        dx = self.world_x[candidates] - x
+        dy = self.world_y[candidates] - y
+        reach = self.size[candidates] + radius
+        return candidates[dx * dx + dy * dy < reach * reach]
+    
+    def is_blocked(self, x, y, size):
+        return len(self.colliding(x, y, size)) > 0
+    
+    def nearest(self, x, y, max_size, max_radius):
+        # Closest slot smaller than max_size within max_radius of (x, y), or None. The grid
+        # is searched in growing squares, so only objects around (x, y) are looked at.
+        radius = self.grid.cell_size
+        while True:
+            radius = min(radius * 2, max_radius)
+            candidates = np.fromiter(self.grid.query(x, y, radius), dtype=np.intp)
+            candidates = candidates[self.size[candidates] < max_size]
+            if len(candidates):
+                dx = self.world_x[candidates] - x
+                dy = self.world_y[candidates] - y
+                dist2 = dx * dx + dy * dy
+                best = int(np.argmin(dist2))
                 
-                # Draw fin
-                fin_points = [
-                    (self.x, self.y - self.size*0.1 + y_offset),
-                    (self.x + self.size*0.3, self.y - self.size*0.6 + y_offset),
-                    (self.x + self.size*0.5, self.y - self.size*0.1 + y_offset)
-                ]
-                pygame.draw.polygon(screen, self.color, [(int(x), int(y)) for x, y in fin_points])
+                # Anything closer lies inside the searched square, so the best one found
+                # within that square's half-width is the nearest
+                if dist2[best] <= radius * radius:
+                    return int(candidates[best])
+            if radius >= max_radius:
+                return None
+    
+    def apply_camera(self, camera, alpha=1.0):
+        # Vectorised version of Camera.apply for every slot, interpolating positions
+        n = self.high_water
+        if alpha == 1.0:
+            self.screen_x[:n] = (self.world_x[:n] - camera.x) * camera.scale
+            self.screen_y[:n] = (self.world_y[:n] - camera.y) * camera.scale
+        else:
+            prev_x = self.prev_x[:n]
+            prev_y = self.prev_y[:n]
+            self.screen_x[:n] = (prev_x + (self.world_x[:n] - prev_x) * alpha - camera.x) * camera.scale
+            self.screen_y[:n] = (prev_y + (self.world_y[:n] - prev_y) * alpha - camera.y) * camera.scale
+    
+    def visible_slots(self, width, height, scale=1.0):
+        # Live slots on screen (with a small buffer), in slot order
+        n = self.high_water
+        sx = self.screen_x[:n]
+        sy = self.screen_y[:n]
+        buffer = self.size[:n] * (2 * scale)
+        on_screen = (self.alive[:n] &
+                     (sx >= -buffer) & (sx <= width + buffer) &
+                     (sy >= -buffer) & (sy <= height + buffer))
+        return np.flatnonzero(on_screen)
+    
+    def draw(self, camera, alpha=1.0):
+        self.apply_camera(camera, alpha)
+        slots = self.visible_slots(SCREEN_WIDTH, SCREEN_HEIGHT, camera.scale)
+        if len(slots) == 0:
+            return
+        
+        # Work out the sprite key and bounce offset of every visible object at once. Sprites
+        # are rendered at the on-screen size, so zooming never rescales a surface.
+        ticks = pygame.time.get_ticks()
+        type_ids = self.type_id[slots]
+        sizes = np.rint(self.size[slots] * camera.scale).astype(np.int32)
+        
+        # Level of detail from the on-screen diameter: 0 flat circle, 1 silhouette, 2 full
+        # detail. Every object keeps full detail until the camera zooms out, and only full
+        # detail is drawn rotated and animated.
+        lods = np.digitize(sizes * 2, [LOD_FLAT_SIZE, LOD_DETAIL_SIZE]).astype(np.int32)
+        detailed = lods == 2
+        
+        period = ObjectStore.TYPE_ROTATION_PERIOD[type_ids]
+        rotation_buckets = np.zeros(len(slots), dtype=np.int32)
+        rotated = (period > 0) & detailed
+        rotation_buckets[rotated] = (self.rotation[slots][rotated] % period[rotated]) / period[rotated] * ROTATION_BUCKETS
+        
+        rate = ObjectStore.TYPE_ANIM_RATE[type_ids]
+        cycle = (ticks * rate + self.anim_offset[slots]) / (2 * math.pi)
+        frames = np.where((rate > 0) & detailed, (cycle % 1) * ANIMATION_FRAMES, 0).astype(np.int32)
+        
+        y_offsets = np.sin(ticks * self.anim_speed[slots] + self.anim_offset[slots]) * (3 * camera.scale)
+        y_offsets[~ObjectStore.TYPE_BOBS[type_ids]] = 0
+        
+        # One cached sprite and one blit per object
+        blit_sequence = []
+        for x, y, y_offset, key in zip(self.screen_x[slots].tolist(), self.screen_y[slots].tolist(),
+                                        y_offsets.astype(np.int32).tolist(),
+                                        zip(type_ids.tolist(), sizes.tolist(), rotation_buckets.tolist(),
+                                            frames.tolist(), lods.tolist())):
+            sprite, anchor = sprite_cache.get(key, lambda: render_object_sprite(*key))
+            blit_sequence.append((sprite, (x - anchor[0], y - anchor[1] + y_offset)))
+        rects = screen.blits(blit_sequence, doreturn=dirty_rects is not None)
+        if rects:
+            dirty_rects.extend(rects)
+
+# Render an object sprite for a (type, size, rotation bucket, animation frame, level of detail) key
+def render_object_sprite(type_id, size, rotation_bucket, frame, lod=2):
+    object_type = Object.TYPES[type_id]
+    if lod == 0:
+        extent = max(1, size)
+        surface = new_surface((extent * 2, extent * 2), pygame.SRCALPHA)
+        pygame.draw.circle(surface, object_type["color"], (extent, extent), extent)
+        return surface, (extent, extent)
+    
+    period = ObjectStore.TYPE_ROTATION_PERIOD[type_id]
+    rotation = (rotation_bucket + 0.5) / ROTATION_BUCKETS * period
+    phase = (frame + 0.5) / ANIMATION_FRAMES * 2 * math.pi
+    
+    # Every shape fits inside 1.6x its size plus a few pixels for the bird's wing
+    extent = int(size * 1.6) + 4
+    surface = new_surface((extent * 2, extent * 2), pygame.SRCALPHA)
+    
+    if lod == 1:
+        draw_object_silhouette(surface, object_type["name"], object_type["color"], extent, extent, size)
+        return surface, (extent, extent)
+    
+    # Seed the mushroom spots from the key so a sprite always looks the same
+    spot_rng = random.Random(hash_seed(type_id, size))
+    draw_object_shape(surface, object_type["name"], object_type["color"], extent, extent,
+                      size, rotation, phase, spot_rng)
+    return surface, (extent, extent)
+
+# Try random positions inside area (left, top, right, bottom; the whole world by default)
+# until one is clear of the player and isn't blocked
+def find_spawn_position(margin, player_x, player_y, safe_radius, is_blocked, area=None, rng=None):
+    rng = world_rng if rng is None else rng
+    left, top, right, bottom = world_area() if area is None else area
+    if right - left < 2 * margin or bottom - top < 2 * margin:
+        return None
+    
+    for _ in range(SPAWN_ATTEMPTS):
+        # Generate position anywhere in the area
+        x = rng.randint(int(left + margin), int(right - margin))
+        y = rng.randint(int(top + margin), int(bottom - margin))
+        
+        # Check distance from player
+        if (x - player_x)**2 + (y - player_y)**2 <= safe_radius**2:
+            continue
+        
+        # Also check nearby entities to prevent overlap
+        if not is_blocked(x, y):
+            return x, y
     
-    def check_collision(self, player):
-        # Calculate distance between centers in world coordinates
-        distance = math.sqrt((self.world_x - player.world_x)**2 + (self.world_y - player.world_y)**2)
-        # Check if circles overlap
-        return distance < (self.size + player.size)
+    # The world is too crowded around here, let the caller skip this entity
+    return None
+
+def generate_objects(count, player_x, player_y, player_size, objects=None, area=None, rng=None):
+    objects = ObjectStore() if objects is None else objects
+    rng = world_rng if rng is None else rng
+    
+    # Define area around player where objects shouldn't spawn
+    safe_radius = player_size * 3
+    
+    for _ in range(count):
+        # Generate random size
+        size = rng.randint(OBJECT_MIN_SIZE, OBJECT_MAX_SIZE)
+        
+        # Ensure objects don't spawn too close to player or on top of each other
+        position = find_spawn_position(size, player_x, player_y, safe_radius,
+                                       lambda x, y: objects.is_blocked(x, y, size), area, rng)
+        if position is None:
+            continue
+        
+        # Create object
+        objects.spawn(position[0], position[1], size, rng)
+    
+    return objects
+
+# Build a temporary grid when the caller doesn't maintain one
+def build_spatial_hash(entities):
+    grid = SpatialHash()
+    for entity in entities:
+        grid.insert(entity, entity.world_x, entity.world_y)
+    return grid
+
+def generate_powerups(count, player_x, player_y, player_size, existing_powerups=None, grid=None, area=None,
+                      rng=None):
+    powerups = [] if existing_powerups is None else existing_powerups
+    if grid is None:
+        grid = build_spatial_hash(powerups)
+    
+    # Check the neighbouring grid cells for power-ups that are too close
+    def is_blocked(x, y):
+        for other in grid.query(x, y, POWERUP_SPACING):
+            if (x - other.world_x)**2 + (y - other.world_y)**2 < POWERUP_SPACING**2:
+                return True
+        return False
+    
+    # Define area around player where powerups shouldn't spawn
+    safe_radius = player_size * 3
+    
+    for _ in range(count):
+        # Ensure powerups don't spawn too close to player or to each other
+        position = find_spawn_position(20, player_x, player_y, safe_radius, is_blocked, area, rng)
+        if position is None:
+            continue
+        
+        # Create powerup
+        powerup = PowerUp(position[0], position[1], rng)
+        powerups.append(powerup)
+        grid.insert(powerup, powerup.world_x, powerup.world_y)
+    
+    return powerups
+
+# The whole world as (left, top, right, bottom), or None when it has no edges
+def world_area():
+    if WORLD_SIZE is None:
+        return None
+    return 0, 0, WORLD_SIZE, WORLD_SIZE
+
+# Where the player starts a game
+def world_center():
+    if WORLD_SIZE is None:
+        return WORLD_CHUNK_SIZE / 2, WORLD_CHUNK_SIZE / 2
+    return WORLD_SIZE / 2, WORLD_SIZE / 2
+
+def chunk_of(x, y):
+    return int(x // WORLD_CHUNK_SIZE), int(y // WORLD_CHUNK_SIZE)
+
+# World rectangle of a chunk, cut off at the world's edges. None if it lies outside the world.
+def chunk_area(chunk_x, chunk_y):
+    left = chunk_x * WORLD_CHUNK_SIZE
+    top = chunk_y * WORLD_CHUNK_SIZE
+    right = left + WORLD_CHUNK_SIZE
+    bottom = top + WORLD_CHUNK_SIZE
+    if WORLD_SIZE is not None:
+        right = min(right, WORLD_SIZE)
+        bottom = min(bottom, WORLD_SIZE)
+        if left < 0 or top < 0 or left >= right or top >= bottom:
+            return None
+    return left, top, right, bottom
+
+# Objects and power-ups of one chunk for a level, generated from a hash of the master
+# seed, level and chunk alone so a chunk always comes out the same. Every entity keeps
+# its margin inside the chunk, so entities of neighbouring chunks never overlap.
+def generate_chunk(level, chunk_x, chunk_y):
+    rng = random.Random(hash_seed(master_seed, level, chunk_x, chunk_y))
+    area = chunk_area(chunk_x, chunk_y)
+    
+    # No player to keep clear of, World.start_level clears the space around it
+    objects = generate_objects(OBJECTS_PER_CHUNK, 0, 0, 0, ObjectStore(max(1, OBJECTS_PER_CHUNK)), area, rng)
+    powerup_count = 1 if rng.random() < POWERUP_CHUNK_CHANCE else 0
+    powerups = generate_powerups(powerup_count, 0, 0, 0, area=area, rng=rng)
+    return objects.export(objects.live_slots()), powerups
+
+# Keeps the objects and power-ups of the chunks around the player in the world. Chunks
+# within WORLD_CHUNK_RADIUS (or a given bigger radius) of the player's chunk are loaded, from their saved state if
+# they were visited before or else from generate_chunk. Chunks that fall more than one
+# chunk further behind are saved and taken out of the world, so crossing a chunk border
+# back and forth doesn't reload anything. Only the SAVED_CHUNK_LIMIT most recently left
+# chunks are kept; older ones are generated afresh when the player comes back.
+class ChunkStreamer:
+    def __init__(self, objects, powerups, powerup_grid, level=1):
+        self.objects = objects
+        self.powerups = powerups
+        self.powerup_grid = powerup_grid
+        self.level = level
+        self.loaded = set()  # (chunk_x, chunk_y) of the chunks in the world
+        self.saved = OrderedDict()  # (chunk_x, chunk_y) -> (object state, power-ups), oldest first
+        self.center = None  # Chunk the player was in at the last update
+        self.radius = WORLD_CHUNK_RADIUS
+    
+    def __len__(self):
+        return len(self.loaded)
+    
+    def update(self, x, y, radius=None):
+        # Nothing changes until the player enters another chunk or the radius changes
+        center = chunk_of(x, y)
+        radius = WORLD_CHUNK_RADIUS if radius is None else max(radius, WORLD_CHUNK_RADIUS)
+        if center == self.center and radius == self.radius:
+            return
+        self.center = center
+        self.radius = radius
+        
+        center_x, center_y = center
+        self.evict([chunk for chunk in self.loaded
+                    if max(abs(chunk[0] - center_x), abs(chunk[1] - center_y)) > radius + 1])
+        for chunk_x in range(center_x - radius, center_x + radius + 1):
+            for chunk_y in range(center_y - radius, center_y + radius + 1):
+                if (chunk_x, chunk_y) not in self.loaded and chunk_area(chunk_x, chunk_y) is not None:
+                    self.load(chunk_x, chunk_y)
+    
+    def load(self, chunk_x, chunk_y):
+        state = self.saved.pop((chunk_x, chunk_y), None)
+        if state is None:
+            state = generate_chunk(self.level, chunk_x, chunk_y)
+        object_state, powerups = state
+        
+        self.objects.restore(object_state)
+        for powerup in powerups:
+            self.powerups.append(powerup)
+            self.powerup_grid.insert(powerup, powerup.world_x, powerup.world_y)
+        self.loaded.add((chunk_x, chunk_y))
+    
+    def evict(self, chunks):
+        if not chunks:
+            return
+        
+        # Entities belong to the chunk they are in now, magnets may have pulled them across
+        slots = self.objects.live_slots()
+        slot_chunk_x = (self.objects.world_x[slots] // WORLD_CHUNK_SIZE).astype(np.int64)
+        slot_chunk_y = (self.objects.world_y[slots] // WORLD_CHUNK_SIZE).astype(np.int64)
+        powerups_by_chunk = {}
+        for powerup in self.powerups:
+            powerups_by_chunk.setdefault(chunk_of(powerup.world_x, powerup.world_y), []).append(powerup)
+        
+        for chunk in chunks:
+            chunk_slots = slots[(slot_chunk_x == chunk[0]) & (slot_chunk_y == chunk[1])]
+            powerups = powerups_by_chunk.pop(chunk, [])
+            self.saved[chunk] = (self.objects.export(chunk_slots), powerups)
+            self.objects.remove(chunk_slots)
+            for powerup in powerups:
+                self.powerup_grid.remove(powerup)
+            self.loaded.discard(chunk)
+        
+        # Power-up list is shared with the World, so filter it in place
+        self.powerups[:] = [powerup for powerups in powerups_by_chunk.values() for powerup in powerups]
+        
+        # Forget the chunks left longest ago
+        while len(self.saved) > SAVED_CHUNK_LIMIT:
+            self.saved.popitem(last=False)
+    
+    def area(self):
+        # Chunks within the loading radius of the player, as (left, top, right, bottom)
+        center_x, center_y = self.center
+        left = (center_x - self.radius) * WORLD_CHUNK_SIZE
+        top = (center_y - self.radius) * WORLD_CHUNK_SIZE
+        right = (center_x + self.radius + 1) * WORLD_CHUNK_SIZE
+        bottom = (center_y + self.radius + 1) * WORLD_CHUNK_SIZE
+        if WORLD_SIZE is not None:
+            left, top = max(left, 0), max(top, 0)
+            right, bottom = min(right, WORLD_SIZE), min(bottom, WORLD_SIZE)
+        return left, top, right, bottom
+
+# Pool of fading particle dots in world coordinates, stored as parallel arrays like the
+# ObjectStore. Dead slots go on a free list and are reused by later emits.
+class ParticleSystem:
+    FIELDS = [
+        ("x", np.float64), ("y", np.float64), ("seek", np.float64),
+        ("life", np.int32), ("max_life", np.int32), ("size", np.int32),
+        ("red", np.uint8), ("green", np.uint8), ("blue", np.uint8), ("alive", np.bool_)
+    ]
+    
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        for name, dtype in ParticleSystem.FIELDS:
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+        self.free_slots = []
+        self.high_water = 0  # Slots at or above this index have never been used
+        self.count = 0
+    
+    def __len__(self):
+        return self.count
+    
+    def _grow(self):
+        # Double every array, keeping the existing slots in place
+        new_capacity = self.capacity * 2
+        for name, dtype in ParticleSystem.FIELDS:
+            array = np.zeros(new_capacity, dtype=dtype)
+            array[:self.capacity] = getattr(self, name)
+            setattr(self, name, array)
+        self.capacity = new_capacity
+    
+    def allocate(self, count):
+        # Reuse free slots first, then slots above the high water mark
+        reused = min(count, len(self.free_slots))
+        slots = self.free_slots[len(self.free_slots) - reused:]
+        del self.free_slots[len(self.free_slots) - reused:]
+        
+        fresh = count - reused
+        while self.high_water + fresh > self.capacity:
+            self._grow()
+        slots = np.concatenate([np.array(slots, dtype=np.intp),
+                                np.arange(self.high_water, self.high_water + fresh, dtype=np.intp)])
+        self.high_water += fresh
+        return slots
+    
+    def emit(self, x, y, size, life, max_life, color, seek=0.0):
+        # Add one particle per entry of x and y. seek is the fraction of the distance to
+        # the update target a particle covers each step (0 = stays put).
+        x = np.atleast_1d(x)
+        slots = self.allocate(len(x))
+        self.x[slots] = x
+        self.y[slots] = y
+        self.size[slots] = size
+        self.life[slots] = life
+        self.max_life[slots] = max_life
+        self.red[slots], self.green[slots], self.blue[slots] = color
+        self.seek[slots] = seek
+        self.alive[slots] = True
+        self.count += len(slots)
+    
+    def update(self, target_x, target_y):
+        n = self.high_water
+        
+        # Age every particle and free the ones that ran out of life
+        life = self.life[:n]
+        life -= 1
+        expired = np.flatnonzero(self.alive[:n] & (life <= 0))
+        if len(expired):
+            self.alive[expired] = False
+            self.count -= len(expired)
+            self.free_slots.extend(expired.tolist())
+        
+        # Move seeking particles toward the target
+        seek = self.seek[:n]
+        x = self.x[:n]
+        y = self.y[:n]
+        x += (target_x - x) * seek
+        y += (target_y - y) * seek
+    
+    def draw(self, camera):
+        slots = np.flatnonzero(self.alive[:self.high_water])
+        size = np.maximum(np.rint(self.size[slots] * camera.scale), 1).astype(np.int32)
+        screen_x = ((self.x[slots] - camera.x) * camera.scale).astype(np.int32)
+        screen_y = ((self.y[slots] - camera.y) * camera.scale).astype(np.int32)
+        on_screen = ((screen_x >= -size) & (screen_x <= SCREEN_WIDTH + size) &
+                     (screen_y >= -size) & (screen_y <= SCREEN_HEIGHT + size))
+        slots, size, screen_x, screen_y = slots[on_screen], size[on_screen], screen_x[on_screen], screen_y[on_screen]
+        if len(slots) == 0:
+            return
+        
+        # Fade with remaining life, in a fixed number of steps so dots can be cached
+        level = np.ceil(self.life[slots] / self.max_life[slots] * PARTICLE_ALPHA_LEVELS).astype(np.int64)
+        level = np.clip(level, 1, PARTICLE_ALPHA_LEVELS)
+        
+        # Look up each distinct (radius, colour, alpha) dot once, then blit them all
+        color = ((self.red[slots].astype(np.int64) << 16) | (self.green[slots].astype(np.int64) << 8) |
+                 self.blue[slots].astype(np.int64))
+        keys = ((size.astype(np.int64) << 24) | color) * (PARTICLE_ALPHA_LEVELS + 1) + level
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        sprites = np.empty(len(unique_keys), dtype=object)
+        for i, key in enumerate(unique_keys.tolist()):
+            key, key_level = divmod(key, PARTICLE_ALPHA_LEVELS + 1)
+            radius, rgb = key >> 24, key & 0xFFFFFF
+            sprites[i] = get_dot_sprite(max(1, radius), (rgb >> 16, (rgb >> 8) & 0xFF, rgb & 0xFF),
+                                        key_level * 255 // PARTICLE_ALPHA_LEVELS)
+        
+        positions = zip((screen_x - size).tolist(), (screen_y - size).tolist())
+        rects = screen.blits(list(zip(sprites[inverse].tolist(), positions)), doreturn=dirty_rects is not None)
+        if rects:
+            dirty_rects.extend(rects)
 
-def generate_objects(count, player_x, player_y, player_size, existing_objects=None):
-    objects = [] if existing_objects is None else existing_objects
-    
-    # Define area around player where objects shouldn't spawn
-    safe_radius = player_size * 3
+# Input for one simulation step. dx/dy are -1, 0 or 1 and space is a SPACE press.
+class PlayerInput:
+    def __init__(self, dx=0, dy=0, space=False):
+        self.dx = dx
+        self.dy = dy
+        self.space = space
+    
+    @staticmethod
+    def from_keys(keys, space=False):
+        dx, dy = 0, 0
+        if keys[pygame.K_LEFT] or keys[pygame.K_a]:
+            dx -= 1
+        if keys[pygame.K_RIGHT] or keys[pygame.K_d]:
+            dx += 1
+        if keys[pygame.K_UP] or keys[pygame.K_w]:
+            dy -= 1
+        if keys[pygame.K_DOWN] or keys[pygame.K_s]:
+            dy += 1
+        return PlayerInput(dx, dy, space)
+
+# Input policy for headless runs: hold a random direction for a random number of steps
+class RandomWalkPolicy:
+    def __init__(self, seed=0):
+        self.rng = random.Random(hash_seed(seed, 3))
+        self.direction = (0, 0)
+        self.steps_left = 0
+    
+    def __call__(self, world):
+        if self.steps_left <= 0:
+            self.direction = (self.rng.randint(-1, 1), self.rng.randint(-1, 1))
+            self.steps_left = self.rng.randint(10, 120)
+        self.steps_left -= 1
+        return PlayerInput(*self.direction, space=world.level_complete or world.game_state != "playing")
+
+# Input policy that plays the game: head for the nearest object it can absorb (or a
+# nearby power-up), steer around bigger objects ahead and wander when there's nothing to
+# chase. Every lookup goes through the collision grids.
+class AutopilotPolicy:
+    def __init__(self, seed=0):
+        self.wander = RandomWalkPolicy(seed)
+    
+    def __call__(self, world):
+        if world.level_complete or world.game_state != "playing":
+            return PlayerInput(space=True)
+        
+        player = world.player
+        objects = world.objects
+        x, y, size = player.world_x, player.world_y, player.size
+        
+        # Nearest object smaller than the player
+        target = None
+        slot = objects.nearest(x, y, size, AUTOPILOT_SEARCH_RADIUS)
+        if slot is not None:
+            target = (float(objects.world_x[slot]), float(objects.world_y[slot]))
+            target_dist = math.hypot(target[0] - x, target[1] - y)
+        
+        # Take a detour for a power-up that isn't much further away. Candidates are
+        # compared on their score, with power-ups counting as BIAS times nearer.
+        best_score = target_dist if target is not None else math.inf
+        for powerup in world.powerup_grid.query(x, y, AUTOPILOT_POWERUP_RANGE):
+            dist = math.hypot(powerup.world_x - x, powerup.world_y - y)
+            score = dist / AUTOPILOT_POWERUP_BIAS
+            if dist < AUTOPILOT_POWERUP_RANGE and score < best_score:
+                target = (powerup.world_x, powerup.world_y)
+                target_dist = dist
+                best_score = score
+        
+        if target is None:
+            return self.wander(world)
+        steer_x = (target[0] - x) / max(target_dist, 1)
+        steer_y = (target[1] - y) / max(target_dist, 1)
+        
+        # Push away from bigger objects ahead, harder the closer their edge is
+        if not player.is_invincible:
+            lookahead = size * AUTOPILOT_LOOKAHEAD
+            slots = objects.colliding(x, y, lookahead)
+            slots = slots[objects.size[slots] >= size]
+            if len(slots):
+                dx = x - objects.world_x[slots]
+                dy = y - objects.world_y[slots]
+                dist = np.maximum(np.sqrt(dx * dx + dy * dy), 1)
+                clearance = dist - objects.size[slots] - size
+                weight = 2 * np.clip(1 - clearance / lookahead, 0, 1)
+                steer_x += float(np.sum(dx / dist * weight))
+                steer_y += float(np.sum(dy / dist * weight))
+        
+        # Turn the steering vector into one of the eight key directions
+        length = math.hypot(steer_x, steer_y)
+        dx = 0 if abs(steer_x) < 0.38 * length else (1 if steer_x > 0 else -1)
+        dy = 0 if abs(steer_y) < 0.38 * length else (1 if steer_y > 0 else -1)
+        return PlayerInput(dx, dy)
+
+# All game state and rules, with no display or audio. Each call to step() advances the
+# game by SIM_DT seconds; sounds the step would play are listed in world.events.
+class World:
+    def __init__(self, seed=None, level_goals=LEVEL_GOALS, screen_size=(DEFAULT_SCREEN_WIDTH, DEFAULT_SCREEN_HEIGHT),
+                 effects=True):
+        # Seed world generation, terrain and effects
+        self.seed = set_master_seed(seed)
+        self.effects = effects  # Spawn cosmetic particles (off for headless runs)
+        
+        # Game state
+        self.game_state = "start"  # "start", "playing", "game_over"
+        self.events = []
+        self.frame = 0
+        
+        # Level system
+        self.current_level = 1
+        self.level_goals = list(level_goals)  # Size goals for each level
+        self.level_complete = False
+        self.level_message_timer = 0
+        
+        # Create camera
+        self.camera = Camera(*screen_size)
+        
+        # Cosmetic particles (absorption bursts and the player's trail)
+        self.particles = ParticleSystem()
+        
+        # Create player at center of world with objects and powerups around it
+        self.start_level(Player(*world_center(), PLAYER_START_SIZE))
     
-    for _ in range(count):
-        # Generate random size
-        size = random.randint(5, 40)
+    def start_level(self, player):
+        self.player = player
         
-        # Ensure objects don't spawn too close to player
-        while True:
-            # Generate position anywhere in the world
-            x = random.randint(size, WORLD_SIZE - size)
-            y = random.randint(size, WORLD_SIZE - size)
+        # Collision grid for powerups, objects keep their own grid in the ObjectStore
+        self.powerup_grid = SpatialHash()
+        self.objects = ObjectStore()
+        self.powerups = []
+        
+        # Load the chunks around the player, with objects and powerups generated for this level
+        self.chunks = ChunkStreamer(self.objects, self.powerups, self.powerup_grid, self.current_level)
+        self.chunks.update(player.world_x, player.world_y)
+        
+        # Clear the area where the player starts
+        safe_radius = player.size * 3
+        self.objects.remove(self.objects.colliding(player.world_x, player.world_y, safe_radius))
+        for powerup in self.powerup_grid.query(player.world_x, player.world_y, safe_radius):
+            if (powerup.world_x - player.world_x)**2 + (powerup.world_y - player.world_y)**2 <= safe_radius**2:
+                self.powerups.remove(powerup)
+                self.powerup_grid.remove(powerup)
+        
+        # Show the new level from its first frame, rather than blending in from the old view
+        player.save_previous()
+        self.camera.reset(player.world_x, player.world_y, player.size)
+    
+    def current_goal(self):
+        if self.current_level <= len(self.level_goals):
+            return self.level_goals[self.current_level-1]
+        return self.level_goals[-1]
+    
+    def press_space(self):
+        if self.game_state == "start":
+            self.game_state = "playing"
+        elif self.game_state == "game_over":
+            # Restart game
+            self.current_level = 1
+            self.start_level(Player(*world_center(), PLAYER_START_SIZE))
+            self.game_state = "playing"
+        elif self.level_complete:
+            # Go to next level
+            self.level_complete = False
+            self.current_level += 1
             
-            # Check distance from player
-            if math.sqrt((x - player_x)**2 + (y - player_y)**2) > safe_radius:
-                # Also check distance from other objects to prevent overlap
-                valid_position = True
-                for obj in objects:
-                    if math.sqrt((x - obj.world_x)**2 + (y - obj.world_y)**2) < (size + obj.size):
-                        valid_position = False
-                        break
-                
-                if valid_position:
-                    break
+            # Reset player size for the new level
+            player = Player(self.player.world_x, self.player.world_y, PLAYER_START_SIZE)
+            player.score = player.score  # Keep the score from previous level
+            
+            if self.current_level > len(self.level_goals):
+                self.player = player
+                self.game_state = "game_over"
+            else:
+                # Generate more objects for the new level
+                self.start_level(player)
+    
+    def step(self, inputs):
+        self.events = []
+        if inputs.space:
+            self.press_space()
         
-        # Create object
-        objects.append(Object(x, y, size))
+        if self.game_state == "playing":
+            self.save_previous()
+            self.step_movement(inputs)
+            profiler.mark("movement")
+            self.step_powerups()
+            profiler.mark("powerups")
+            self.step_objects()
+            profiler.mark("objects")
+            self.step_collisions()
+            profiler.mark("collisions")
+            self.step_progress()
+            profiler.mark("progress")
+            self.step_spawning()
+            profiler.mark("spawning")
+        
+        self.frame += 1
     
-    return objects
-
-def generate_powerups(count, player_x, player_y, player_size, existing_powerups=None):
-    powerups = [] if existing_powerups is None else existing_powerups
+    def save_previous(self):
+        # Keep the state before this step for drawing in between steps
+        self.player.save_previous()
+        self.camera.save_previous()
+        self.objects.save_previous()
     
-    # Define area around player where powerups shouldn't spawn
-    safe_radius = player_size * 3
+    def step_movement(self, inputs):
+        player = self.player
+        
+        # Move player
+        player.move(inputs.dx * player.speed, inputs.dy * player.speed)
+        
+        # Leave a trail dot behind the player
+        if self.effects:
+            self.particles.emit(player.world_x, player.world_y, int(player.size * 0.5),
+                                TRAIL_LIFE, TRAIL_LIFE, player.trail_color)
+        
+        # Update camera to follow player, zooming out as it grows
+        self.camera.update(player.world_x, player.world_y, player.size)
     
-    for _ in range(count):
-        # Ensure powerups don't spawn too close to player
-        while True:
-            # Generate position anywhere in the world
-            x = random.randint(20, WORLD_SIZE - 20)
-            y = random.randint(20, WORLD_SIZE - 20)
-            
-            # Check distance from player
-            if math.sqrt((x - player_x)**2 + (y - player_y)**2) > safe_radius:
-                # Also check distance from other objects to prevent overlap
-                valid_position = True
-                for pu in powerups:
-                    if math.sqrt((x - pu.world_x)**2 + (y - pu.world_y)**2) < 40:
-                        valid_position = False
-                        break
-                
-                if valid_position:
-                    break
+    def step_powerups(self):
+        # Update player powerups
+        self.player.update_powerups()
         
-        # Create powerup
-        powerups.append(PowerUp(x, y))
+        # Update powerups
+        for powerup in self.powerups:
+            powerup.update()
     
-    return powerups
-
-def draw_grass_background(camera):
-    # Calculate visible area in world coordinates
-    visible_x = camera.x
-    visible_y = camera.y
-    visible_width = SCREEN_WIDTH
-    visible_height = SCREEN_HEIGHT
+    def step_objects(self):
+        player = self.player
+        
+        # Update objects
+        self.objects.update()
+        
+        # If magnet is active, move smaller objects toward player
+        if player.magnet_range > 0:
+            self.objects.apply_magnets([(player.world_x, player.world_y, player.magnet_range, player.size)])
+        
+        # Fade particles and pull absorption particles into the player
+        self.particles.update(player.world_x, player.world_y)
     
-    # Draw base color first - more natural earthy green
-    screen.fill((45, 85, 45))
-    
-    # Store the last camera position to maintain consistency between frames
-    if not hasattr(draw_grass_background, "last_camera_pos"):
-        draw_grass_background.last_camera_pos = (camera.x, camera.y)
-        draw_grass_background.terrain_features = []
-    
-    # Only regenerate terrain features when camera moves significantly
-    camera_moved = (abs(camera.x - draw_grass_background.last_camera_pos[0]) > 200 or
-                   abs(camera.y - draw_grass_background.last_camera_pos[1]) > 200)
-    
-    if camera_moved or not draw_grass_background.terrain_features:
-        # Update last camera position
-        draw_grass_background.last_camera_pos = (camera.x, camera.y)
-        
-        # Clear previous features
-        draw_grass_background.terrain_features = []
-        
-        # Generate new terrain features based on camera position
-        # Use fixed positions based on a grid to ensure consistency
-        grid_size = 500
-        for grid_x in range(int((camera.x - SCREEN_WIDTH) // grid_size), 
-                           int((camera.x + SCREEN_WIDTH * 2) // grid_size) + 1):
-            for grid_y in range(int((camera.y - SCREEN_HEIGHT) // grid_size), 
-                               int((camera.y + SCREEN_HEIGHT * 2) // grid_size) + 1):
-                
-                # Generate a consistent seed for this grid cell
-                base_x = grid_x * grid_size
-                base_y = grid_y * grid_size
+    def step_collisions(self):
+        player = self.player
+        objects = self.objects
+        
+        # Check collisions with objects, only testing the grid cells the player overlaps
+        objects_to_remove = []
+        for slot in objects.colliding(player.world_x, player.world_y, player.size).tolist():
+            obj = objects.get(slot)
+            if obj.size < player.size:
+                # Absorb smaller objects
+                player.grow(GROW_FACTOR, obj.points)
+                self.events.append("grow")
                 
-                # Add some features to each grid cell
-                for i in range(5):  # Limit number of features per cell
-                    # Use a hash of the position to get consistent random values
-                    feature_seed = hash((grid_x, grid_y, i)) % 10000
-                    random.seed(feature_seed)
+                # Create absorption particles
+                if self.effects:
+                    spread = int(obj.size)
+                    for _ in range(5):
+                        particle_x = obj.world_x + effects_rng.randint(-spread, spread)
+                        particle_y = obj.world_y + effects_rng.randint(-spread, spread)
+                        self.particles.emit(particle_x, particle_y, effects_rng.randint(2, 5),
+                                            effects_rng.randint(15, 30), 30, obj.color, seek=0.2)
                     
-                    # Calculate position within the grid cell
-                    offset_x = random.randint(50, grid_size - 50)
-                    offset_y = random.randint(50, grid_size - 50)
-                    pos_x = base_x + offset_x
-                    pos_y = base_y + offset_y
-                    
-                    # Determine terrain feature type
-                    feature_type = random.randint(0, 10)
-                    
-                    # Store feature data
-                    feature = {
-                        "world_x": pos_x,
-                        "world_y": pos_y,
-                        "type": feature_type,
-                        "seed": feature_seed,
-                        "size": random.randint(50, 300) if feature_type <= 5 else random.randint(15, 40)
-                    }
-                    
-                    draw_grass_background.terrain_features.append(feature)
+                objects_to_remove.append(slot)
+            else:
+                # Shrink when hitting larger objects
+                if player.shrink(SHRINK_FACTOR):
+                    self.events.append("shrink")
+        
+        # Check collisions with powerups
+        powerups_to_remove = []
+        for powerup in self.powerup_grid.query(player.world_x, player.world_y, player.size + POWERUP_SIZE):
+            if powerup.check_collision(player):
+                player.apply_powerup(powerup)
+                self.events.append("powerup")
+                powerups_to_remove.append(powerup)
+        
+        # Remove absorbed objects
+        objects.remove(objects_to_remove)
+            
+        # Remove collected powerups
+        for powerup in powerups_to_remove:
+            self.powerups.remove(powerup)
+            self.powerup_grid.remove(powerup)
+    
+    def step_progress(self):
+        # Count down the level complete message
+        if self.level_complete:
+            self.level_message_timer -= 1
+        
+        # Check level completion
+        if (not self.level_complete and self.current_level <= len(self.level_goals) and
+                self.player.size >= self.current_goal()):
+            self.level_complete = True
+            self.level_message_timer = 3 * SIM_RATE  # Show message for 3 seconds
+            self.events.append("win")
+        
+        # Check win condition (completed all levels)
+        if self.current_level > len(self.level_goals):
+            self.game_state = "game_over"
+            self.events.append("win")
     
-    # Reset random seed to avoid affecting game logic
-    random.seed()
+    def step_spawning(self):
+        player = self.player
+        
+        # Bring in the chunks the player is heading into and put away the ones left behind,
+        # loading far enough out to fill a zoomed-out view
+        view_radius = max(self.camera.view_size()) / 2
+        self.chunks.update(player.world_x, player.world_y, math.ceil(view_radius / WORLD_CHUNK_SIZE))
+        
+        # Generate new objects around the player if needed
+        if len(self.objects) < OBJECTS_PER_CHUNK * len(self.chunks):
+            generate_objects(OBJECT_REFILL, player.world_x, player.world_y, player.size, self.objects,
+                             self.chunks.area())
+            
+        # Generate new powerups if needed
+        if len(self.powerups) < POWERUP_COUNT:
+            generate_powerups(1, player.world_x, player.world_y, player.size, self.powerups, self.powerup_grid,
+                              self.chunks.area())
+
+# Terrain features anchored in one grid cell, generated from a hash of the cell
+def generate_terrain_features(grid_x, grid_y):
+    grid_size = TERRAIN_CHUNK_SIZE
+    base_x = grid_x * grid_size
+    base_y = grid_y * grid_size
+    features = []
+    
+    # Add some features to each grid cell
+    for i in range(5):  # Limit number of features per cell
+        # Use a hash of the master seed and position to get consistent random values
+        feature_seed = hash_seed(master_seed, grid_x, grid_y, i)
+        rng = random.Random(feature_seed)
+        
+        # Calculate position within the grid cell
+        offset_x = rng.randint(50, grid_size - 50)
+        offset_y = rng.randint(50, grid_size - 50)
+        pos_x = base_x + offset_x
+        pos_y = base_y + offset_y
+        
+        # Determine terrain feature type
+        feature_type = rng.randint(0, 10)
+        
+        # Store feature data
+        feature = {
+            "world_x": pos_x,
+            "world_y": pos_y,
+            "type": feature_type,
+            "seed": feature_seed,
+            "size": rng.randint(50, 300) if feature_type <= 5 else rng.randint(15, 40)
+        }
+        
+        features.append(feature)
     
-    # Draw all terrain features
-    for feature in draw_grass_background.terrain_features:
-        # Calculate screen position
-        screen_x, screen_y = camera.apply(feature["world_x"], feature["world_y"])
+    return features
+
+# Draw one terrain feature centred on (x, y) of the given surface
+def draw_terrain_feature(surface, feature, x, y):
+    # Use a private generator seeded for this feature to ensure consistent appearance
+    rng = random.Random(feature["seed"])
+    
+    if feature["type"] <= 3:  # Grass patch (40% chance)
+        # Lighter or darker grass patch
+        if rng.random() < 0.5:
+            color = (60, 100, 60)  # Lighter
+        else:
+            color = (35, 75, 35)   # Darker
+        
+        size = feature["size"]
+        # Draw an irregular shape instead of a perfect circle
+        points = []
+        for angle in range(0, 360, 30):
+            rad = math.radians(angle)
+            dist = size * (0.7 + rng.random() * 0.6)
+            px = x + math.cos(rad) * dist
+            py = y + math.sin(rad) * dist
+            points.append((px, py))
         
-        # Only draw if potentially visible (with buffer)
-        if (-300 <= screen_x <= SCREEN_WIDTH + 300 and
-            -300 <= screen_y <= SCREEN_HEIGHT + 300):
+        pygame.draw.polygon(surface, color, points)
+        
+    elif feature["type"] <= 5:  # Dirt patch (20% chance)
+        color = (80, 65, 45)
+        size = feature["size"]
+        pygame.draw.circle(surface, color, (x, y), size)
+        
+        # Add some texture to the dirt
+        for _ in range(10):
+            small_x = x + rng.randint(-size//2, size//2)
+            small_y = y + rng.randint(-size//2, size//2)
+            small_size = rng.randint(5, 15)
+            dark_brown = (70, 55, 35)
+            pygame.draw.circle(surface, dark_brown, (small_x, small_y), small_size)
             
-            # Set the random seed for this feature to ensure consistent appearance
-            random.seed(feature["seed"])
+    elif feature["type"] <= 7:  # Flower patch (20% chance)
+        base_color = (50, 90, 50)
+        size = feature["size"]
+        pygame.draw.circle(surface, base_color, (x, y), size)
+        
+        # Add flowers
+        flower_count = rng.randint(10, 30)
+        for _ in range(flower_count):
+            fx = x + rng.randint(-size, size)
+            fy = y + rng.randint(-size, size)
             
-            if feature["type"] <= 3:  # Grass patch (40% chance)
-                # Lighter or darker grass patch
-                if random.random() < 0.5:
-                    color = (60, 100, 60)  # Lighter
-                else:
-                    color = (35, 75, 35)   # Darker
+            # Only draw if within the patch (roughly)
+            if math.sqrt((fx - x)**2 + (fy - y)**2) <= size:
+                flower_size = rng.randint(3, 8)
                 
-                size = feature["size"]
-                # Draw an irregular shape instead of a perfect circle
-                points = []
-                for angle in range(0, 360, 30):
+                # Choose flower color
+                if rng.random() < 0.3:
+                    flower_color = (255, 255, 255)  # White
+                elif rng.random() < 0.5:
+                    flower_color = (255, 255, 100)  # Yellow
+                else:
+                    flower_color = (255, 150, 150)  # Pink
+                    
+                # Draw petals
+                for angle in range(0, 360, 45):
                     rad = math.radians(angle)
-                    dist = size * (0.7 + random.random() * 0.6)
-                    px = screen_x + math.cos(rad) * dist
-                    py = screen_y + math.sin(rad) * dist
-                    points.append((px, py))
+                    px = fx + math.cos(rad) * flower_size
+                    py = fy + math.sin(rad) * flower_size
+                    pygame.draw.circle(surface, flower_color, (int(px), int(py)), flower_size//2)
                 
-                pygame.draw.polygon(screen, color, points)
-                
-            elif feature["type"] <= 5:  # Dirt patch (20% chance)
-                color = (80, 65, 45)
-                size = feature["size"]
-                pygame.draw.circle(screen, color, (screen_x, screen_y), size)
-                
-                # Add some texture to the dirt
-                for _ in range(10):
-                    small_x = screen_x + random.randint(-size//2, size//2)
-                    small_y = screen_y + random.randint(-size//2, size//2)
-                    small_size = random.randint(5, 15)
-                    dark_brown = (70, 55, 35)
-                    pygame.draw.circle(screen, dark_brown, (small_x, small_y), small_size)
-                    
-            elif feature["type"] <= 7:  # Flower patch (20% chance)
-                base_color = (50, 90, 50)
-                size = feature["size"]
-                pygame.draw.circle(screen, base_color, (screen_x, screen_y), size)
+                # Draw center
+                pygame.draw.circle(surface, (255, 220, 0), (int(fx), int(fy)), flower_size//2)
                 
-                # Add flowers
-                flower_count = random.randint(10, 30)
-                for _ in range(flower_count):
-                    fx = screen_x + random.randint(-size, size)
-                    fy = screen_y + random.randint(-size, size)
-                    
-                    # Only draw if within the patch (roughly)
-                    if math.sqrt((fx - screen_x)**2 + (fy - screen_y)**2) <= size:
-                        flower_size = random.randint(3, 8)
-                        
-                        # Choose flower color
-                        if random.random() < 0.3:
-                            flower_color = (255, 255, 255)  # White
-                        elif random.random() < 0.5:
-                            flower_color = (255, 255, 100)  # Yellow
-                        else:
-                            flower_color = (255, 150, 150)  # Pink
-                            
-                        # Draw petals
-                        for angle in range(0, 360, 45):
-                            rad = math.radians(angle)
-                            px = fx + math.cos(rad) * flower_size
-                            py = fy + math.sin(rad) * flower_size
-                            pygame.draw.circle(screen, flower_color, (int(px), int(py)), flower_size//2)
-                        
-                        # Draw center
-                        pygame.draw.circle(screen, (255, 220, 0), (int(fx), int(fy)), flower_size//2)
-                        
-            else:  # Stone formation (20% chance)
-                for _ in range(random.randint(3, 8)):
-                    stone_x = screen_x + random.randint(-100, 100)
-                    stone_y = screen_y + random.randint(-100, 100)
-                    stone_size = random.randint(15, 40)
-                    stone_color = (100 + random.randint(-20, 20), 
-                                 100 + random.randint(-20, 20), 
-                                 100 + random.randint(-20, 20))
-                    pygame.draw.circle(screen, stone_color, (stone_x, stone_y), stone_size)
-    
-    # Reset random seed to avoid affecting game logic
-    random.seed()
+    else:  # Stone formation (20% chance)
+        for _ in range(rng.randint(3, 8)):
+            stone_x = x + rng.randint(-100, 100)
+            stone_y = y + rng.randint(-100, 100)
+            stone_size = rng.randint(15, 40)
+            stone_color = (100 + rng.randint(-20, 20), 
+                         100 + rng.randint(-20, 20), 
+                         100 + rng.randint(-20, 20))
+            pygame.draw.circle(surface, stone_color, (stone_x, stone_y), stone_size)
+
+# Rasterise one grid cell of terrain. Features can spill up to ~400px past their
+# cell, so the neighbouring cells are drawn too (clipped by the surface) in the
+# same order a full-world render would use.
+def render_terrain_chunk(chunk_x, chunk_y):
+    surface = new_surface((TERRAIN_CHUNK_SIZE, TERRAIN_CHUNK_SIZE))
+    
+    # Draw base color first - more natural earthy green
+    surface.fill((45, 85, 45))
     
+    origin_x = chunk_x * TERRAIN_CHUNK_SIZE
+    origin_y = chunk_y * TERRAIN_CHUNK_SIZE
+    for grid_x in range(chunk_x - 1, chunk_x + 2):
+        for grid_y in range(chunk_y - 1, chunk_y + 2):
+            for feature in generate_terrain_features(grid_x, grid_y):
+                draw_terrain_feature(surface, feature,
+                                     feature["world_x"] - origin_x, feature["world_y"] - origin_y)
+    
+    return surface
+
+# Baked terrain chunks around the camera, keyed by (chunk_x, chunk_y) at full size and
+# (chunk_x, chunk_y, pixels) when scaled down
+terrain_chunks = SpriteCache(TERRAIN_CHUNK_CACHE_SIZE, TERRAIN_CACHE_BYTES)
+
+# A terrain chunk drawn pixels wide. Smaller sizes are scaled from the nearest bigger
+# level of a pyramid of halvings, and every level is cached, so each zoom level costs one
+# rescale per chunk the first time it's seen instead of one per frame.
+def get_terrain_chunk(chunk_x, chunk_y, pixels=TERRAIN_CHUNK_SIZE):
+    if pixels >= TERRAIN_CHUNK_SIZE:
+        return terrain_chunks.get((chunk_x, chunk_y), lambda: render_terrain_chunk(chunk_x, chunk_y))
+    
+    def render():
+        source_pixels = TERRAIN_CHUNK_SIZE
+        while source_pixels // 2 > pixels:
+            source_pixels //= 2
+        source = get_terrain_chunk(chunk_x, chunk_y, source_pixels)
+        return pygame.transform.smoothscale(source, (pixels, pixels))
+    return terrain_chunks.get((chunk_x, chunk_y, pixels), render)
+
+# First and last chunk coordinates covering the camera's view
+def terrain_chunk_range(camera):
+    view_width, view_height = camera.view_size()
+    first_x = int(camera.x // TERRAIN_CHUNK_SIZE)
+    first_y = int(camera.y // TERRAIN_CHUNK_SIZE)
+    last_x = int((camera.x + view_width) // TERRAIN_CHUNK_SIZE)
+    last_y = int((camera.y + view_height) // TERRAIN_CHUNK_SIZE)
+    return first_x, first_y, last_x, last_y
+
+# Screen x of each chunk column and y of each chunk row in view, as draw_terrain blits them
+def terrain_layout(camera):
+    first_x, first_y, last_x, last_y = terrain_chunk_range(camera)
+    columns = tuple((chunk_x, camera.apply(chunk_x * TERRAIN_CHUNK_SIZE, 0)[0]) for chunk_x in range(first_x, last_x + 1))
+    rows = tuple((chunk_y, camera.apply(0, chunk_y * TERRAIN_CHUNK_SIZE)[1]) for chunk_y in range(first_y, last_y + 1))
+    return columns, rows
+
+def draw_grass_background(camera):
+    draw_terrain(camera)
+    draw_ambient_particles()
+
+def draw_terrain(camera):
+    # Calculate the chunks covering the visible area and where they go on screen
+    columns, rows = terrain_layout(camera)
+    
+    # Keep at least two screens' worth of chunks so small moves never re-bake, with room
+    # for the pyramid levels of each
+    visible_chunks = len(columns) * len(rows)
+    terrain_chunks.max_entries = max(TERRAIN_CHUNK_CACHE_SIZE, visible_chunks * 8)
+    
+    # Blit each chunk at the camera's scale (rounded up so neighbours never leave a gap),
+    # rasterising it the first time it comes into view
+    pixels = math.ceil(TERRAIN_CHUNK_SIZE * camera.scale)
+    blit_sequence = []
+    for chunk_x, screen_x in columns:
+        for chunk_y, screen_y in rows:
+            blit_sequence.append((get_terrain_chunk(chunk_x, chunk_y, pixels), (screen_x, screen_y)))
+    screen.blits(blit_sequence, doreturn=False)
+
+# Butterflies, pollen and glints drifting over the screen
+def draw_ambient_particles():
     # Store ambient particles if they don't exist yet
     if not hasattr(draw_grass_background, "ambient_particles"):
         draw_grass_background.ambient_particles = []
         for i in range(8):  # Reduced number of particles
             particle = {
-                "base_x": random.random() * SCREEN_WIDTH,
-                "base_y": random.random() * SCREEN_HEIGHT,
+                "base_x": effects_rng.random() * SCREEN_WIDTH,
+                "base_y": effects_rng.random() * SCREEN_HEIGHT,
                 "offset_x": 0,
                 "offset_y": 0,
-                "speed": random.uniform(0.1, 0.3),  # Even slower speed
-                "size": random.randint(1, 2),  # Smaller particles
-                "type": random.randint(0, 2),
-                "phase": random.random() * math.pi * 2  # Random starting phase
+                "speed": effects_rng.uniform(0.1, 0.3),  # Even slower speed
+                "size": effects_rng.randint(1, 2),  # Smaller particles
+                "type": effects_rng.randint(0, 2),
+                "phase": effects_rng.random() * math.pi * 2  # Random starting phase
             }
             draw_grass_background.ambient_particles.append(particle)
     
@@ -1074,6 +2501,7 @@ def draw_grass_background(camera):
         
         particle_x = (particle["base_x"] + particle["offset_x"]) % SCREEN_WIDTH
         particle_y = (particle["base_y"] + particle["offset_y"]) % SCREEN_HEIGHT
+        mark_dirty((int(particle_x) - 6, int(particle_y) - 4, 12, 8))
         
         # Different particle types
         if particle["type"] == 0:  # Butterfly
@@ -1094,19 +2522,15 @@ def draw_grass_background(camera):
                                
         elif particle["type"] == 1:  # Pollen/dust
             size = particle["size"]
-            color = (255, 255, 220, 80)  # More transparent
-            s = pygame.Surface((size*2, size*2), pygame.SRCALPHA)
-            pygame.draw.circle(s, color, (size, size), size)
-            screen.blit(s, (int(particle_x - size), int(particle_y - size)))
+            dot = get_dot_sprite(size, (255, 255, 220), 80)  # More transparent
+            screen.blit(dot, (int(particle_x - size), int(particle_y - size)))
             
         else:  # Light reflection
             size = particle["size"]
-            color = (255, 255, 255, 50)  # Very transparent
-            s = pygame.Surface((size*2, size*2), pygame.SRCALPHA)
-            pygame.draw.circle(s, color, (size, size), size)
-            screen.blit(s, (int(particle_x - size), int(particle_y - size)))
+            dot = get_dot_sprite(size, (255, 255, 255), 50)  # Very transparent
+            screen.blit(dot, (int(particle_x - size), int(particle_y - size)))
 
-def draw_ui(player, game_over=False, current_level=1, level_goals=[100]):
+def draw_ui(player, current_level=1, level_goals=[100]):
     # Get screen dimensions for responsive UI
     screen_width = screen.get_width()
     screen_height = screen.get_height()
@@ -1116,7 +2540,7 @@ def draw_ui(player, game_over=False, current_level=1, level_goals=[100]):
     info_height = int(screen_height * 0.15)  # 15% of screen height
     
     # Draw a semi-transparent overlay for the info bar
-    s = pygame.Surface((info_width, info_height), pygame.SRCALPHA)
+    s = new_surface((info_width, info_height), pygame.SRCALPHA)
     s.fill((20, 20, 50, 180))  # Dark blue with transparency
     screen.blit(s, (0, 0))
     
@@ -1162,35 +2586,38 @@ def draw_ui(player, game_over=False, current_level=1, level_goals=[100]):
     font_size_large = max(22, int(screen_width * 0.03))
     
     # Draw text
-    font = pygame.font.Font(None, font_size_medium)
-    size_text = font.render(f"Size: {int(player.size)}/{current_goal}", True, WHITE)
-    screen.blit(size_text, (screen_width//2 - size_text.get_width()//2, 15 + bar_height//2 - size_text.get_height()//2))
+    size_text = render_text(f"Size: {int(player.size)}/{current_goal}", font_size_medium, WHITE)
+    size_rect = screen.blit(size_text, (screen_width//2 - size_text.get_width()//2, 15 + bar_height//2 - size_text.get_height()//2))
     
     # Draw level information below the progress bar
-    level_font = pygame.font.Font(None, font_size_medium)
-    level_text = level_font.render(f"Level {current_level}", True, WHITE)
-    screen.blit(level_text, (screen_width//2 - level_text.get_width()//2, 20 + bar_height))
+    level_text = render_text(f"Level {current_level}", font_size_medium, WHITE)
+    level_rect = screen.blit(level_text, (screen_width//2 - level_text.get_width()//2, 20 + bar_height))
+    bar_rect = pygame.Rect(screen_width//2 - bar_width//2 - border_width, 15 - border_width,
+                           bar_width + border_width*2, bar_height + border_width*2)
+    mark_hud("progress", bar_rect.unionall([size_rect, level_rect]),
+             (int(player.size), current_goal, current_level, int(bar_width * progress)))
     
     # Draw info bar content
     y_offset = int(info_height * 0.1)  # 10% of info bar height
-    header_font = pygame.font.Font(None, font_size_large)
     
     # Score section
-    score_text = header_font.render(f"Score: {player.score}", True, (255, 255, 150))
-    screen.blit(score_text, (10, y_offset))
+    score_text = render_text(f"Score: {player.score}", font_size_large, (255, 255, 150))
+    info_rects = [screen.blit(score_text, (10, y_offset))]
     y_offset += int(info_height * 0.3)  # 30% of info bar height
     
     # Objects collected
-    obj_text = header_font.render(f"Objects: {player.objects_collected}", True, (150, 255, 150))
-    screen.blit(obj_text, (10, y_offset))
+    obj_text = render_text(f"Objects: {player.objects_collected}", font_size_large, (150, 255, 150))
+    info_rects.append(screen.blit(obj_text, (10, y_offset)))
     y_offset += int(info_height * 0.3)  # 30% of info bar height
     
     # Sound status
     if sound_enabled:
-        sound_text = header_font.render("Sound: ON (M)", True, (150, 150, 255))
+        sound_text = render_text("Sound: ON (M)", font_size_large, (150, 150, 255))
     else:
-        sound_text = header_font.render("Sound: OFF (M)", True, (255, 150, 150))
-    screen.blit(sound_text, (10, y_offset))
+        sound_text = render_text("Sound: OFF (M)", font_size_large, (255, 150, 150))
+    info_rects.append(screen.blit(sound_text, (10, y_offset)))
+    mark_hud("info", pygame.Rect(0, 0, info_width, info_height).unionall(info_rects),
+             (player.score, player.objects_collected, sound_enabled))
     
     # Draw mini-map in top-right corner
     map_size = int(screen_width * 0.15)  # 15% of screen width
@@ -1220,23 +2647,34 @@ def draw_ui(player, game_over=False, current_level=1, level_goals=[100]):
     
     # Draw player on map with a pulsing effect
     pulse = math.sin(pygame.time.get_ticks() * 0.01) * 1.5 + 4
-    player_map_x = map_x + int(player.world_x / WORLD_SIZE * map_size)
-    player_map_y = map_y + int(player.world_y / WORLD_SIZE * map_size)
+    if WORLD_SIZE is not None:
+        player_map_x = map_x + int(player.world_x / WORLD_SIZE * map_size)
+        player_map_y = map_y + int(player.world_y / WORLD_SIZE * map_size)
+    else:
+        # A world without edges is mapped as the loaded chunks around the player's chunk
+        map_chunks = WORLD_CHUNK_RADIUS * 2 + 1
+        chunk_x, chunk_y = chunk_of(player.world_x, player.world_y)
+        map_left = (chunk_x - WORLD_CHUNK_RADIUS) * WORLD_CHUNK_SIZE
+        map_top = (chunk_y - WORLD_CHUNK_RADIUS) * WORLD_CHUNK_SIZE
+        player_map_x = map_x + int((player.world_x - map_left) / (map_chunks * WORLD_CHUNK_SIZE) * map_size)
+        player_map_y = map_y + int((player.world_y - map_top) / (map_chunks * WORLD_CHUNK_SIZE) * map_size)
     
     # Draw player position indicator
     pygame.draw.circle(screen, (100, 100, 255, 150), (player_map_x, player_map_y), int(pulse))
     pygame.draw.circle(screen, BLUE, (player_map_x, player_map_y), 3)
     
     # Draw "MAP" label
-    map_label = font.render("MAP", True, WHITE)
-    screen.blit(map_label, (map_x + map_size//2 - map_label.get_width()//2, map_y - map_label.get_height() - 5))
+    map_label = render_text("MAP", font_size_medium, WHITE)
+    label_rect = screen.blit(map_label, (map_x + map_size//2 - map_label.get_width()//2, map_y - map_label.get_height() - 5))
+    map_rect = pygame.Rect(map_x - 2, map_y - 2, map_size + 4, map_size + 4).inflate(12, 12)  # Room for the pulse
+    mark_hud("map", map_rect.union(label_rect), (player_map_x, player_map_y, int(pulse)))
     
     # Draw active power-ups
     if player.active_powerups:
         pu_y = info_height + 30
-        pu_font = pygame.font.Font(None, font_size_small)
-        pu_title = pu_font.render("Active Power-ups:", True, (200, 200, 255))
-        screen.blit(pu_title, (10, pu_y))
+        pu_title = render_text("Active Power-ups:", font_size_small, (200, 200, 255))
+        powerup_rects = [screen.blit(pu_title, (10, pu_y))]
+        powerup_state = []
         pu_y += 25
         
         for i, powerup in enumerate(player.active_powerups):
@@ -1250,27 +2688,13 @@ def draw_ui(player, game_over=False, current_level=1, level_goals=[100]):
             pygame.draw.rect(screen, powerup['color'], (35, pu_y - 5, int(bar_length * remaining), 10))
             
             # Draw name
-            name_text = pu_font.render(powerup['name'].capitalize(), True, WHITE)
-            screen.blit(name_text, (40 + bar_length, pu_y - 5))
+            name_text = render_text(powerup['name'].capitalize(), font_size_small, WHITE)
+            powerup_rects.append(screen.blit(name_text, (40 + bar_length, pu_y - 5)))
+            powerup_rects.append(pygame.Rect(10, pu_y - 10, 25 + bar_length, 21))
+            powerup_state.append((powerup['name'], int(bar_length * remaining)))
             
             pu_y += 20
-    
-    # Draw game over message
-    if game_over:
-        # Create a semi-transparent overlay
-        overlay = pygame.Surface((screen_width, screen_height), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 128))
-        screen.blit(overlay, (0, 0))
-        
-        # Draw win message
-        win_font = pygame.font.Font(None, int(screen_width * 0.08))  # 8% of screen width
-        win_text = win_font.render("You Win!", True, WHITE)
-        screen.blit(win_text, (screen_width//2 - win_text.get_width()//2, screen_height//2 - win_text.get_height()))
-        
-        # Draw restart instruction
-        sub_font = pygame.font.Font(None, int(screen_width * 0.04))  # 4% of screen width
-        sub_text = sub_font.render("Press SPACE to play again", True, WHITE)
-        screen.blit(sub_text, (screen_width//2 - sub_text.get_width()//2, screen_height//2 + 50))
+        mark_hud("powerups", powerup_rects[0].unionall(powerup_rects), tuple(powerup_state))
 
 def show_message(text, size=36):
     # Get screen dimensions
@@ -1280,12 +2704,16 @@ def show_message(text, size=36):
     # Scale font size based on screen dimensions
     font_size = max(size, int(screen_width * size/800))
     
-    font = pygame.font.Font(None, font_size)
-    text_surface = font.render(text, True, WHITE)
+    text_surface = render_text(text, font_size, WHITE)
     text_rect = text_surface.get_rect(center=(screen_width/2, screen_height/2))
     screen.blit(text_surface, text_rect)
 
-def draw_start_screen():
+def draw_start_screen(loading_progress=None):
+    draw_start_screen_background()
+    draw_start_screen_animation(loading_progress)
+
+# Parts of the start screen that never move
+def draw_start_screen_background():
     # Get screen dimensions
     screen_width = screen.get_width()
     screen_height = screen.get_height()
@@ -1296,11 +2724,9 @@ def draw_start_screen():
     # Scale font sizes based on screen dimensions
     title_size = max(48, int(screen_width * 0.08))
     instruction_size = max(24, int(screen_width * 0.03))
-    space_size = max(32, int(screen_width * 0.04))
     
     # Draw title
-    title_font = pygame.font.Font(None, title_size)
-    title_text = title_font.render("Katamari Adventure", True, WHITE)
+    title_text = render_text("Katamari Adventure", title_size, WHITE)
     screen.blit(title_text, (screen_width//2 - title_text.get_width()//2, screen_height//4))
     
     # Draw instructions
@@ -1321,20 +2747,26 @@ def draw_start_screen():
         "Space to start game"
     ]
     
-    font = pygame.font.Font(None, instruction_size)
     y_offset = screen_height//2 - 50
     
     for line in instructions:
-        text = font.render(line, True, WHITE)
+        text = render_text(line, instruction_size, WHITE)
         screen.blit(text, (screen_width//2 - text.get_width()//2, y_offset))
         y_offset += int(screen_height * 0.04)  # 4% of screen height
+
+# Animated parts of the start screen, drawn over draw_start_screen_background
+def draw_start_screen_animation(loading_progress=None):
+    # Get screen dimensions
+    screen_width = screen.get_width()
+    screen_height = screen.get_height()
+    space_size = max(32, int(screen_width * 0.04))
     
     # Draw animated player
     player_size = int(screen_width * 0.05) + math.sin(pygame.time.get_ticks() * 0.003) * int(screen_width * 0.01)
     player_x = screen_width//2
     player_y = screen_height//4 - int(screen_height * 0.1)
     
-    pygame.draw.circle(screen, BLUE, (player_x, player_y), int(player_size))
+    mark_dirty(pygame.draw.circle(screen, BLUE, (player_x, player_y), int(player_size)))
     
     # Draw stripes on player
     rotation = (pygame.time.get_ticks() * 0.05) % 360
@@ -1358,7 +2790,7 @@ def draw_start_screen():
         
         # Choose color based on position
         colors = [RED, GREEN, BLUE, YELLOW, PURPLE, ORANGE, PINK, BROWN]
-        pygame.draw.circle(screen, colors[i], (int(x), int(y)), int(obj_size))
+        mark_dirty(pygame.draw.circle(screen, colors[i], (int(x), int(y)), int(obj_size)))
         
     # Draw power-ups
     for i in range(4):
@@ -1371,399 +2803,638 @@ def draw_start_screen():
         
         # Draw glowing effect
         glow_size = pu_size * 1.5 + math.sin(pygame.time.get_ticks() * 0.01 + i) * 2
-        glow_surface = pygame.Surface((int(glow_size*2), int(glow_size*2)), pygame.SRCALPHA)
-        for j in range(3):
-            alpha = 100 - j * 30
-            size = glow_size - j * 2
-            pygame.draw.circle(glow_surface, (*pu_colors[i], alpha), 
-                             (int(glow_size), int(glow_size)), int(size))
-        screen.blit(glow_surface, (int(pu_x - glow_size), int(pu_y - glow_size)))
+        mark_dirty(draw_halo(screen, pu_x, pu_y, glow_size, pu_colors[i], 100, rings=3))
         
         # Draw power-up
         pygame.draw.circle(screen, pu_colors[i], (int(pu_x), int(pu_y)), int(pu_size))
         
+    # Draw a loading bar while assets are still streaming in
+    if loading_progress is not None and loading_progress < 1:
+        bar_width = int(screen_width * 0.3)
+        bar_height = max(4, int(screen_height * 0.01))
+        bar_x = screen_width//2 - bar_width//2
+        bar_y = screen_height - int(screen_height * 0.11)
+        mark_dirty(pygame.draw.rect(screen, (40, 40, 40), (bar_x, bar_y, bar_width, bar_height)))
+        pygame.draw.rect(screen, LIGHT_GREEN, (bar_x, bar_y, int(bar_width * loading_progress), bar_height))
+    
     # Draw "Press SPACE to start" with pulsing effect
-    space_font = pygame.font.Font(None, space_size)
     pulse = math.sin(pygame.time.get_ticks() * 0.005) * 0.2 + 0.8
     space_color = (int(255 * pulse), int(255 * pulse), int(255 * pulse))
-    space_text = space_font.render("Press SPACE to start", True, space_color)
-    screen.blit(space_text, (screen_width//2 - space_text.get_width()//2, screen_height - int(screen_height * 0.08)))
+    space_text = render_text("Press SPACE to start", space_size, space_color)
+    mark_dirty(screen.blit(space_text, (screen_width//2 - space_text.get_width()//2, screen_height - int(screen_height * 0.08))))
 
-def main():
-    # Access global variables
-    global fullscreen, SCREEN_WIDTH, SCREEN_HEIGHT, screen, sound_enabled
+# Draw a world to the screen, alpha of the way from its previous step to the current one
+def draw_world(world, alpha=1.0):
+    camera = world.camera.interpolated(alpha)
+    draw_world_background(world, camera)
+    draw_world_foreground(world, camera, alpha)
+
+# The layer that only changes when the camera moves: terrain, or the start screen's text
+def draw_world_background(world, camera):
+    if world.game_state == "start":
+        draw_start_screen_background()
+    else:
+        # Draw everything
+        screen.fill(BLACK)
+        
+        # Draw grass background
+        draw_terrain(camera)
+
+# Everything drawn over the background layer
+def draw_world_foreground(world, camera, alpha=1.0):
+    draw_world_scene(world, camera, alpha)
+    mark_hud("hint", draw_overlay(screen, world), None)
+    profiler.mark("draw_ui")
+
+# The start screen's animation, or the entities and HUD
+def draw_world_scene(world, camera, alpha=1.0):
+    player = world.player
+    
+    if world.game_state == "start":
+        # Draw start screen
+        draw_start_screen_animation(asset_loader.progress() if asset_loader else None)
+    else:
+        draw_ambient_particles()
+        profiler.mark("background")
+        
+        # Draw objects
+        world.objects.draw(camera, alpha)
+        profiler.mark("draw_objects")
+            
+        # Draw powerups
+        for powerup in world.powerups:
+            powerup.draw(camera)
+        profiler.mark("draw_powerups")
+        
+        # Draw player with its trail and absorption particles underneath
+        world.particles.draw(camera)
+        player.draw(camera, alpha)
+        profiler.mark("draw_player")
+        
+        # Draw UI with level information
+        draw_ui(player, world.current_level, world.level_goals)
+
+# Which message dims the screen, if any
+def overlay_of(world):
+    if world.game_state == "game_over":
+        return "game_over"
+    if world.game_state == "playing" and world.level_complete:
+        return "level_complete"
+    return None
+
+# Dim the screen under the level-complete or game-over message, then draw the fullscreen
+# hint on top. Everything is drawn onto surface shifted by -offset, so a piece of the
+# screen can be finished on its own. Returns the hint's screen rect.
+def draw_overlay(surface, world, offset=(0, 0)):
+    screen_width, screen_height = screen.get_size()
+    offset_x, offset_y = offset
+    
+    def blit(text, x, y):
+        surface.blit(text, (x - offset_x, y - offset_y))
+        return pygame.Rect((x, y), text.get_size())
+    
+    overlay = overlay_of(world)
+    if overlay is not None:
+        # Semi-transparent black over everything drawn so far
+        pygame.gfxdraw.box(surface, surface.get_rect(), (0, 0, 0, 128))
+    
+    if overlay == "level_complete":
+        # Scale font size based on screen dimensions
+        title_font_size = max(48, int(screen_width * 0.06))
+        subtitle_font_size = max(32, int(screen_width * 0.04))
+        
+        complete_text = render_text(f"Level {world.current_level} Complete!", title_font_size, WHITE)
+        blit(complete_text, screen_width//2 - complete_text.get_width()//2, screen_height//2 - 50)
+        
+        if world.current_level < len(world.level_goals):
+            next_text = render_text("Press SPACE for next level", subtitle_font_size, WHITE)
+            blit(next_text, screen_width//2 - next_text.get_width()//2, screen_height//2 + 20)
+        else:
+            win_text = render_text("You've completed all levels!", subtitle_font_size, WHITE)
+            blit(win_text, screen_width//2 - win_text.get_width()//2, screen_height//2 + 20)
     
-    # Game state
-    game_state = "start"  # "start", "playing", "game_over"
+    elif overlay == "game_over":
+        # Draw win message
+        win_text = render_text("You Win!", int(screen_width * 0.08), WHITE)  # 8% of screen width
+        blit(win_text, screen_width//2 - win_text.get_width()//2, screen_height//2 - win_text.get_height())
+        
+        # Draw restart instruction
+        sub_text = render_text("Press SPACE to play again", int(screen_width * 0.04), WHITE)  # 4% of screen width
+        blit(sub_text, screen_width//2 - sub_text.get_width()//2, screen_height//2 + 50)
+        
+        # Draw final score
+        font_size = max(48, int(screen_width * 0.06))
+        score_text = render_text(f"Final Score: {world.player.score}", font_size, WHITE)
+        blit(score_text, screen_width//2 - score_text.get_width()//2, screen_height//2 - 100)
+    
+    # Draw fullscreen toggle hint
+    hint_text = render_text("Press F to toggle fullscreen", max(16, int(screen_width * 0.02)), (200, 200, 200))
+    return blit(hint_text, screen_width - hint_text.get_width() - 10, screen_height - hint_text.get_height() - 10)
+
+# Draws frames by repainting and presenting only the screen regions that changed since the
+# previous frame. The background layer is kept in an off-screen copy and restored under
+# whatever was drawn last frame; any camera move, resize or change of overlay falls back
+# to a full redraw and flip.
+class DirtyRectRenderer:
+    def __init__(self):
+        self.background = None  # Copy of the background layer for self.view
+        self.scene = None  # The undimmed background and foreground while an overlay is up
+        self.view = None
+        self.previous_rects = []  # Regions drawn over the background last frame
+        self.previous_hud = {}
+        self.full = True  # Whether the frame being drawn is a full redraw
+        self.full_frames = 0
+        self.partial_frames = 0
+    
+    def view_of(self, world, camera):
+        # What the background layer and the overlay over everything depend on
+        if world.game_state == "start":
+            return ("start", screen.get_size())
+        # The terrain moves in whole pixels, so only the blit positions of its chunks matter
+        return ("playing", overlay_of(world), world.current_level, terrain_layout(camera), camera.scale,
+                screen.get_size(), master_seed)
+    
+    def restore(self, surface):
+        # Put the background back wherever something was drawn last frame
+        for rect in self.previous_rects:
+            surface.blit(self.background, rect, rect)
+        for rect, _ in self.previous_hud.values():
+            surface.blit(self.background, rect, rect)
+    
+    def draw(self, world, alpha=1.0):
+        global screen, dirty_rects, hud_widgets
+        camera = world.camera.interpolated(alpha)
+        view = self.view_of(world, camera)
+        self.full = view != self.view
+        self.view = view
+        
+        if self.full:
+            draw_world_background(world, camera)
+            # Keep a copy of the new background to restore from
+            if self.background is None or self.background.get_size() != screen.get_size():
+                self.background = new_surface(screen.get_size())
+            self.background.blit(screen, (0, 0))
+        
+        # Draw the foreground, collecting every region it touches
+        dirty_rects = []
+        hud_widgets = {}
+        if overlay_of(world) is None:
+            if not self.full:
+                self.restore(screen)
+            draw_world_foreground(world, camera, alpha)
+            return
+        
+        # Under an overlay the scene is drawn undimmed off-screen, and each changed region
+        # is dimmed on its way to the screen, so no pixel is ever dimmed twice
+        if self.scene is None or self.scene.get_size() != screen.get_size():
+            self.scene = new_surface(screen.get_size())
+        if self.full:
+            self.scene.blit(self.background, (0, 0))
+        else:
+            self.restore(self.scene)
+        display = screen
+        screen = self.scene
+        try:
+            draw_world_scene(world, camera, alpha)
+        finally:
+            screen = display
+        
+        if self.full:
+            screen.blit(self.scene, (0, 0))
+            draw_overlay(screen, world)
+        else:
+            regions = self.previous_rects + dirty_rects
+            regions += [rect for rect, _ in list(self.previous_hud.values()) + list(hud_widgets.values())]
+            for rect in regions:
+                rect = pygame.Rect(rect).clip(screen.get_rect())
+                if rect.width and rect.height:
+                    piece = self.scene.subsurface(rect).copy()
+                    draw_overlay(piece, world, rect.topleft)
+                    screen.blit(piece, rect)
+        profiler.mark("draw_ui")
+    
+    def present(self):
+        global dirty_rects, hud_widgets
+        rects, hud = dirty_rects, hud_widgets
+        dirty_rects = hud_widgets = None
+        
+        if not self.full:
+            # Regions that changed: where things were, where they are now, and HUD widgets
+            # whose contents or placement changed
+            update_rects = self.previous_rects + rects
+            for name in set(hud) | set(self.previous_hud):
+                new = hud.get(name)
+                old = self.previous_hud.get(name)
+                if new != old:
+                    update_rects.extend(entry[0] for entry in (new, old) if entry is not None)
+        
+        self.previous_rects = rects
+        self.previous_hud = hud
+        if self.full or len(update_rects) > DIRTY_RECT_LIMIT:
+            pygame.display.flip()
+            self.full_frames += 1
+        else:
+            pygame.display.update(update_rects)
+            self.partial_frames += 1
+
+# Input recordings are a gzip stream of a header followed by tagged records:
+#   header  b"KTMR", version, master seed (low 64 bits), screen width and height, world size
+#           (0 = no edges)
+#   b"F"    one frame: movement key bits, simulation steps run, flags (bit 0: the first step
+#           got a SPACE press), drawing alpha in 1/255ths
+#   b"K"    a SPACE, M or F key press, before the frame it happened in
+#   b"R"    the screen size changed, before the frame it happened in
+#   b"E"    end of the recording with world_digest of the final state
+REPLAY_MAGIC = b"KTMR"
+REPLAY_VERSION = 1
+REPLAY_HEADER = struct.Struct("<4sHQHHI")
+REPLAY_FRAME = struct.Struct("<BBBB")
+REPLAY_KEY = struct.Struct("<H")
+REPLAY_RESIZE = struct.Struct("<HH")
+REPLAY_END = struct.Struct("<Q")
+
+# Movement keys stored in a recording, one bit each in this order
+RECORDED_KEYS = [pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN,
+                 pygame.K_a, pygame.K_d, pygame.K_w, pygame.K_s]
+
+def key_bits(keys):
+    return sum(1 << i for i, key in enumerate(RECORDED_KEYS) if keys[key])
+
+def keys_from_bits(bits):
+    return {key: bool(bits >> i & 1) for i, key in enumerate(RECORDED_KEYS)}
+
+# Arrow key bits of a direction, so input that didn't come from the keyboard records the same way
+def direction_bits(dx, dy):
+    keys = dict.fromkeys(RECORDED_KEYS, False)
+    keys.update({pygame.K_LEFT: dx < 0, pygame.K_RIGHT: dx > 0, pygame.K_UP: dy < 0, pygame.K_DOWN: dy > 0})
+    return key_bits(keys)
+
+# 64-bit hash of the simulation state, equal for two runs only if they stayed bit-exact
+def world_digest(world):
+    player = world.player
+    objects = world.objects
+    slots = objects.live_slots()
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(struct.pack("<dddqqq", player.world_x, player.world_y, player.size, player.score,
+                              world.current_level, world.frame))
+    digest.update(objects.world_x[slots].tobytes())
+    digest.update(objects.world_y[slots].tobytes())
+    digest.update(objects.size[slots].tobytes())
+    for powerup in world.powerups:
+        digest.update(struct.pack("<dd", powerup.world_x, powerup.world_y))
+    return struct.unpack("<Q", digest.digest())[0]
+
+# Writes what the simulation was given each frame, so a session can be replayed exactly
+class InputRecorder:
+    def __init__(self, path, seed, screen_size):
+        self.file = gzip.open(path, "wb")
+        # Seeds only reach the game through hash_seed, which reads their low 64 bits, so
+        # those are all a recording needs, whatever the sign or size of the seed
+        self.file.write(REPLAY_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, seed & 0xFFFFFFFFFFFFFFFF,
+                                           *screen_size, WORLD_SIZE or 0))
+        self.frames = 0
+    
+    def key(self, key):
+        self.file.write(b"K" + REPLAY_KEY.pack(key))
+    
+    def resize(self, width, height):
+        self.file.write(b"R" + REPLAY_RESIZE.pack(width, height))
+    
+    def frame(self, bits, steps, space, alpha):
+        self.file.write(b"F" + REPLAY_FRAME.pack(bits, steps, int(space), int(alpha * 255)))
+        self.frames += 1
+    
+    def close(self, world):
+        self.file.write(b"E" + REPLAY_END.pack(world_digest(world)))
+        self.file.close()
+
+# Reads a recording back one frame at a time
+class InputReplay:
+    def __init__(self, path):
+        self.file = gzip.open(path, "rb")
+        magic, version, self.seed, width, height, world_size = REPLAY_HEADER.unpack(
+            self.file.read(REPLAY_HEADER.size))
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError(f"{path} is not a version {REPLAY_VERSION} Katamari Adventure recording")
+        if self.seed >= 1 << 63:
+            # Read back as negative, so a recording of --seed -1 reports seed -1
+            self.seed -= 1 << 64
+        self.screen_size = (width, height)
+        self.world_size = world_size or None
+        self.digest = None  # Final state digest, known once the end record is read
+        self.frames = 0
+    
+    def next_frame(self):
+        # Returns (events, key bits, steps, space, alpha) or None at the end. Events are
+        # ("key", key) and ("resize", (width, height)) in the order they happened.
+        events = []
+        while True:
+            tag = self.file.read(1)
+            if tag == b"K":
+                events.append(("key", REPLAY_KEY.unpack(self.file.read(REPLAY_KEY.size))[0]))
+            elif tag == b"R":
+                events.append(("resize", REPLAY_RESIZE.unpack(self.file.read(REPLAY_RESIZE.size))))
+            elif tag == b"F":
+                bits, steps, flags, alpha = REPLAY_FRAME.unpack(self.file.read(REPLAY_FRAME.size))
+                self.frames += 1
+                return events, bits, steps, bool(flags & 1), alpha / 255
+            elif tag == b"E":
+                self.digest = REPLAY_END.unpack(self.file.read(REPLAY_END.size))[0]
+                return None
+            else:
+                # A recording cut short (the game was killed) ends without a digest
+                return None
+    
+    def close(self):
+        self.file.close()
+
+# Run a recording through the simulation without a display, as fast as possible. Returns
+# the world, the number of frames and whether the final state matched the recording
+# (None if the recording has no digest).
+def run_replay(path):
+    global WORLD_SIZE
+    replay = InputReplay(path)
+    WORLD_SIZE = replay.world_size
+    world = World(replay.seed, screen_size=replay.screen_size, effects=False)
+    
+    while True:
+        frame = replay.next_frame()
+        if frame is None:
+            break
+        events, bits, steps, space, _ = frame
+        for event, value in events:
+            if event == "resize":
+                world.camera.width, world.camera.height = value
+        inputs = PlayerInput.from_keys(keys_from_bits(bits), space)
+        for _ in range(steps):
+            world.step(inputs)
+            inputs.space = False
+    replay.close()
+    
+    matched = None if replay.digest is None else replay.digest == world_digest(world)
+    return world, replay.frames, matched
+
+# Flip sound and background music on or off
+def toggle_sound():
+    global sound_enabled
+    sound_enabled = not sound_enabled
+    if sound_enabled:
+        try:
+            pygame.mixer.music.unpause()
+        except:
+            pass
+    else:
+        try:
+            pygame.mixer.music.pause()
+        except:
+            pass
+
+# Switch the display to a new size and fit the camera and cached text to it
+def resize_screen(world, width, height, flags=pygame.RESIZABLE):
+    global SCREEN_WIDTH, SCREEN_HEIGHT, screen
+    SCREEN_WIDTH, SCREEN_HEIGHT = width, height
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), flags)
+    
+    # Update camera dimensions
+    world.camera.width = SCREEN_WIDTH
+    world.camera.height = SCREEN_HEIGHT
+    clear_text_cache()
+
+def main(seed=None, profile_dump=None, fps=FPS, startup_report=False, dirty=False, record=None, replay=None,
+         autopilot=False):
+    # Access global variables
+    global fullscreen, asset_loader, WORLD_SIZE, SCREEN_WIDTH, SCREEN_HEIGHT
     
-    # Create player at center of world
-    player = Player(WORLD_SIZE/2, WORLD_SIZE/2, PLAYER_START_SIZE)
+    # A replay brings its own seed, window size and world
+    if replay:
+        replay = InputReplay(replay)
+        seed = replay.seed
+        SCREEN_WIDTH, SCREEN_HEIGHT = replay.screen_size
+        WORLD_SIZE = replay.world_size
     
-    # Create camera
-    camera = Camera(SCREEN_WIDTH, SCREEN_HEIGHT)
+    # Open the window and start audio
+    timed_startup("display", init_display)
+    audio = timed_startup("audio", init_audio)
     
-    # Generate initial objects
-    objects = generate_objects(100, player.world_x, player.world_y, player.size)
+    # Create the world, seeding generation, terrain and effects
+    world = timed_startup("world", World, seed, LEVEL_GOALS, (SCREEN_WIDTH, SCREEN_HEIGHT))
+    print(f"World seed: {world.seed}")
+    recorder = InputRecorder(record, world.seed, (SCREEN_WIDTH, SCREEN_HEIGHT)) if record else None
+    autopilot = AutopilotPolicy(world.seed) if autopilot and not replay else None
     
-    # Generate initial powerups
-    powerups = generate_powerups(5, player.world_x, player.world_y, player.size)
+    # Load sounds and terrain in the background while the start screen is up
+    asset_loader = AssetLoader()
+    load_assets(asset_loader, world, audio)
     
     # Start background music
-    try:
-        pygame.mixer.music.load(os.path.join(sounds_dir, "background.wav"))
-        pygame.mixer.music.play(-1)  # Loop indefinitely
-    except Exception as e:
-        print(f"Could not load background music: {e}")
-        print("Continuing without background music.")
+    if audio:
+        try:
+            timed_startup("music", pygame.mixer.music.load, os.path.join(sounds_dir, "background.wav"))
+            pygame.mixer.music.play(-1)  # Loop indefinitely
+        except Exception as e:
+            print(f"Could not load background music: {e}")
+            print("Continuing without background music.")
     
     # Game variables
     running = True
-    
-    # Level system
-    current_level = 1
-    level_goals = [100, 200, 300, 400, 500]  # Size goals for each level
-    level_complete = False
-    level_message_timer = 0
+    space_pressed = False
+    accumulator = 0.0  # Real time not yet simulated, in seconds
+    frame_time = SIM_DT
+    renderer = DirtyRectRenderer() if dirty else None
+    first_frame = None
+    reported = not startup_report
     
     # Main game loop
     while running:
-        # Handle events
+        # Handle events. During a replay the keyboard only controls the profiler overlay.
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                # Toggle the profiler overlay
+                profiler.visible = not profiler.visible
+            elif replay:
+                continue
             elif event.type == pygame.KEYDOWN:
+                if recorder and event.key in (pygame.K_SPACE, pygame.K_m, pygame.K_f):
+                    recorder.key(event.key)
                 if event.key == pygame.K_SPACE:
-                    if game_state == "start":
-                        game_state = "playing"
-                    elif game_state == "game_over":
-                        # Restart game
-                        player = Player(WORLD_SIZE/2, WORLD_SIZE/2, PLAYER_START_SIZE)
-                        objects = generate_objects(100, player.world_x, player.world_y, player.size)
-                        powerups = generate_powerups(5, player.world_x, player.world_y, player.size)
-                        current_level = 1
-                        game_state = "playing"
-                    elif level_complete:
-                        # Go to next level
-                        level_complete = False
-                        current_level += 1
-                        
-                        # Reset player size for the new level
-                        player = Player(player.world_x, player.world_y, PLAYER_START_SIZE)
-                        player.score = player.score  # Keep the score from previous level
-                        
-                        if current_level > len(level_goals):
-                            game_state = "game_over"
-                        else:
-                            # Generate more objects for the new level
-                            objects = generate_objects(100, player.world_x, player.world_y, player.size)
-                            powerups = generate_powerups(5, player.world_x, player.world_y, player.size)
+                    # Start, restart or advance a level on the next step
+                    space_pressed = True
                 elif event.key == pygame.K_m:
                     # Toggle sound
-                    sound_enabled = not sound_enabled
-                    if sound_enabled:
-                        try:
-                            pygame.mixer.music.unpause()
-                        except:
-                            pass
-                    else:
-                        try:
-                            pygame.mixer.music.pause()
-                        except:
-                            pass
+                    toggle_sound()
                 elif event.key == pygame.K_f:
                     # Toggle fullscreen
                     fullscreen = not fullscreen
                     if fullscreen:
-                        # Get the current screen info
+                        # Get the current screen info and set to fullscreen mode
                         screen_info = pygame.display.Info()
-                        # Set to fullscreen mode
-                        SCREEN_WIDTH = screen_info.current_w
-                        SCREEN_HEIGHT = screen_info.current_h
-                        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.FULLSCREEN)
+                        resize_screen(world, screen_info.current_w, screen_info.current_h, pygame.FULLSCREEN)
                     else:
                         # Return to windowed mode
-                        SCREEN_WIDTH = DEFAULT_SCREEN_WIDTH
-                        SCREEN_HEIGHT = DEFAULT_SCREEN_HEIGHT
-                        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.RESIZABLE)
-                    
-                    # Update camera dimensions
-                    camera.width = SCREEN_WIDTH
-                    camera.height = SCREEN_HEIGHT
+                        resize_screen(world, DEFAULT_SCREEN_WIDTH, DEFAULT_SCREEN_HEIGHT)
+                    if recorder:
+                        recorder.resize(SCREEN_WIDTH, SCREEN_HEIGHT)
             
             elif event.type == pygame.VIDEORESIZE:
                 # Handle window resize events
                 if not fullscreen:
-                    SCREEN_WIDTH, SCREEN_HEIGHT = event.size
-                    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.RESIZABLE)
-                    # Update camera dimensions
-                    camera.width = SCREEN_WIDTH
-                    camera.height = SCREEN_HEIGHT
-        
-        if game_state == "start":
-            # Draw start screen
-            draw_start_screen()
-            
-        elif game_state == "playing":
-            # Handle movement
-            keys = pygame.key.get_pressed()
-            dx, dy = 0, 0
-            if keys[pygame.K_LEFT] or keys[pygame.K_a]:
-                dx -= player.speed
-            if keys[pygame.K_RIGHT] or keys[pygame.K_d]:
-                dx += player.speed
-            if keys[pygame.K_UP] or keys[pygame.K_w]:
-                dy -= player.speed
-            if keys[pygame.K_DOWN] or keys[pygame.K_s]:
-                dy += player.speed
-            
-            # Move player
-            player.move(dx, dy)
-            
-            # Update player particles
-            player.update_particles()
-            
-            # Update player powerups
-            player.update_powerups()
-            
-            # Update camera to follow player
-            camera.update(player.world_x, player.world_y)
-            
-            # Update objects
-            for obj in objects:
-                obj.update()
-                
-                # If magnet is active, move smaller objects toward player
-                if player.magnet_range > 0 and obj.size < player.size:
-                    dist = math.sqrt((obj.world_x - player.world_x)**2 + (obj.world_y - player.world_y)**2)
-                    if dist < player.magnet_range:
-                        # Calculate direction to player
-                        dx = player.world_x - obj.world_x
-                        dy = player.world_y - obj.world_y
-                        # Normalize
-                        if dist > 0:
-                            dx /= dist
-                            dy /= dist
-                        # Move object toward player
-                        pull_strength = 2 * (1 - dist/player.magnet_range)
-                        obj.world_x += dx * pull_strength
-                        obj.world_y += dy * pull_strength
-            
-            # Update powerups
-            for powerup in powerups:
-                powerup.update()
-            
-            # Check collisions with objects
-            objects_to_remove = []
-            for obj in objects:
-                if obj.check_collision(player):
-                    if obj.size < player.size:
-                        # Absorb smaller objects
-                        player.grow(GROW_FACTOR, obj.points)
-                        
-                        # Create absorption particles
-                        obj_screen_x, obj_screen_y = camera.apply(obj.world_x, obj.world_y)
-                        for _ in range(5):
-                            particle_x = obj_screen_x + random.randint(-int(obj.size), int(obj.size))
-                            particle_y = obj_screen_y + random.randint(-int(obj.size), int(obj.size))
-                            player.add_absorption_particle(particle_x, particle_y, obj.color)
-                            
-                        objects_to_remove.append(obj)
-                    else:
-                        # Shrink when hitting larger objects
-                        player.shrink()
-            
-            # Check collisions with powerups
-            powerups_to_remove = []
-            for powerup in powerups:
-                if powerup.check_collision(player):
-                    player.apply_powerup(powerup)
-                    powerups_to_remove.append(powerup)
-            
-            # Remove absorbed objects
-            for obj in objects_to_remove:
-                objects.remove(obj)
-                
-            # Remove collected powerups
-            for powerup in powerups_to_remove:
-                powerups.remove(powerup)
-            
-            # Check level completion
-            current_goal = level_goals[current_level-1] if current_level <= len(level_goals) else level_goals[-1]
-            if not level_complete and current_level <= len(level_goals) and player.size >= current_goal:
-                level_complete = True
-                level_message_timer = 180  # Show message for 3 seconds (60 FPS)
-                if sound_enabled:
-                    try:
-                        sounds["win"].play()
-                    except:
-                        pass
-            
-            # Check win condition (completed all levels)
-            if current_level > len(level_goals):
-                game_state = "game_over"
-                if sound_enabled:
-                    try:
-                        sounds["win"].play()
-                    except:
-                        pass
-            
-            # Generate new objects if needed
-            if len(objects) < 100:
-                objects = generate_objects(20, player.world_x, player.world_y, player.size, objects)
-                
-            # Generate new powerups if needed
-            if len(powerups) < 5:
-                powerups = generate_powerups(1, player.world_x, player.world_y, player.size, powerups)
-            
-            # Draw everything
-            screen.fill(BLACK)
-            
-            # Draw grass background
-            draw_grass_background(camera)
-            
-            # Draw objects
-            for obj in objects:
-                obj.draw(camera)
-                
-            # Draw powerups
-            for powerup in powerups:
-                powerup.draw(camera)
-            
-            # Draw player
-            player.draw(camera)
-            
-            # Draw UI with level information
-            draw_ui(player, game_state == "game_over", current_level, level_goals)
-            
-            # Draw level complete message
-            if level_complete:
-                level_message_timer -= 1
-                
-                # Create a semi-transparent overlay
-                overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-                overlay.fill((0, 0, 0, 128))
-                screen.blit(overlay, (0, 0))
-                
-                # Scale font size based on screen dimensions
-                title_font_size = max(48, int(SCREEN_WIDTH * 0.06))
-                subtitle_font_size = max(32, int(SCREEN_WIDTH * 0.04))
-                
-                font = pygame.font.Font(None, title_font_size)
-                complete_text = font.render(f"Level {current_level} Complete!", True, WHITE)
-                screen.blit(complete_text, (SCREEN_WIDTH//2 - complete_text.get_width()//2, SCREEN_HEIGHT//2 - 50))
-                
-                if current_level < len(level_goals):
-                    font = pygame.font.Font(None, subtitle_font_size)
-                    next_text = font.render("Press SPACE for next level", True, WHITE)
-                    screen.blit(next_text, (SCREEN_WIDTH//2 - next_text.get_width()//2, SCREEN_HEIGHT//2 + 20))
-                else:
-                    font = pygame.font.Font(None, subtitle_font_size)
-                    win_text = font.render("You've completed all levels!", True, WHITE)
-                    screen.blit(win_text, (SCREEN_WIDTH//2 - win_text.get_width()//2, SCREEN_HEIGHT//2 + 20))
+                    resize_screen(world, *event.size)
+                    if recorder:
+                        recorder.resize(SCREEN_WIDTH, SCREEN_HEIGHT)
+        
+        
+        # Pick up assets that finished loading
+        asset_loader.poll()
+        profiler.mark("events")
+        
+        if replay:
+            # Take this frame's input, step count and window changes from the recording
+            frame = replay.next_frame()
+            if frame is None:
+                break
+            events, bits, steps, space, alpha = frame
+            for event, value in events:
+                if event == "key" and value == pygame.K_m:
+                    toggle_sound()
+                elif event == "resize":
+                    resize_screen(world, *value)
+        else:
+            # Advance the simulation in fixed steps covering the real time since the last frame
+            accumulator += min(frame_time, MAX_FRAME_TIME)
+            steps = 0
+            while accumulator >= SIM_DT:
+                accumulator -= SIM_DT
+                steps += 1
+            alpha = accumulator / SIM_DT
             
-        elif game_state == "game_over":
-            # Keep drawing the game but with win message
-            screen.fill(BLACK)
-            draw_grass_background(camera)
-            for obj in objects:
-                obj.draw(camera)
-            for powerup in powerups:
-                powerup.draw(camera)
-            player.draw(camera)
-            draw_ui(player, True, current_level, level_goals)
+            # The game only starts once the assets it can't play without are in
+            start_allowed = world.game_state != "start" or asset_loader.ready()
+            if autopilot:
+                # The autopilot drives instead of the keyboard, and starts each level itself
+                decision = autopilot(world)
+                bits = direction_bits(decision.dx, decision.dy)
+                space_pressed = space_pressed or decision.space
+            else:
+                bits = key_bits(pygame.key.get_pressed())
+            space = space_pressed and start_allowed
             
-            # Draw final score
-            font_size = max(48, int(SCREEN_WIDTH * 0.06))
-            font = pygame.font.Font(None, font_size)
-            score_text = font.render(f"Final Score: {player.score}", True, WHITE)
-            screen.blit(score_text, (SCREEN_WIDTH//2 - score_text.get_width()//2, SCREEN_HEIGHT//2 - 100))
+            # A SPACE press only counts once, and waits for the next step if there was none
+            if space and steps > 0:
+                space_pressed = False
+        
+        # Run the steps and play the sounds each step asked for
+        if recorder:
+            recorder.frame(bits, steps, space and steps > 0, alpha)
+        inputs = PlayerInput.from_keys(keys_from_bits(bits), space)
+        for _ in range(steps):
+            world.step(inputs)
+            for event_name in world.events:
+                play_sound(SOUND_EVENTS[event_name])
+            inputs.space = False
+        
+        # Draw everything, part of the way toward the next step
+        if renderer:
+            renderer.draw(world, alpha)
+        else:
+            draw_world(world, alpha)
         
-        # Draw fullscreen toggle hint
-        hint_font = pygame.font.Font(None, max(16, int(SCREEN_WIDTH * 0.02)))
-        hint_text = hint_font.render("Press F to toggle fullscreen", True, (200, 200, 200))
-        screen.blit(hint_text, (SCREEN_WIDTH - hint_text.get_width() - 10, SCREEN_HEIGHT - hint_text.get_height() - 10))
+        # Draw the profiler overlay
+        if profiler.visible:
+            mark_dirty(profiler.draw(screen))
+        profiler.mark("overlay")
         
         # Update display
-        pygame.display.flip()
+        if renderer:
+            renderer.present()
+        else:
+            pygame.display.flip()
+        profiler.mark("present")
+        if first_frame is None:
+            first_frame = time.perf_counter() - startup_start
+        if not reported and asset_loader.finished():
+            print(f"First frame after {first_frame * 1000:.1f} ms, "
+                  f"assets loaded after {(asset_loader.finish_time - startup_start) * 1000:.1f} ms (from launch)")
+            print_startup_report()
+            reported = True
         
-        # Cap the frame rate
-        clock.tick(FPS)
+        # Cap the frame rate (0 = uncapped) and measure how long the frame took
+        frame_time = clock.tick(fps) / 1000
+        profiler.mark("idle")
+        profiler.end_frame(len(world.objects), len(world.powerups),
+                           len(world.particles))
+    
+    asset_loader.shutdown()
+    if recorder:
+        recorder.close(world)
+        print(f"Recorded {recorder.frames} frames to {record}")
+    if replay:
+        replay.close()
+        if replay.digest is not None:
+            result = "matches" if replay.digest == world_digest(world) else "does NOT match"
+            print(f"Replayed {replay.frames} frames, final state {result} the recording")
+    if profile_dump:
+        profiler.dump(profile_dump)
+        print(f"Profile of the last {min(profiler.frames, profiler.history)} frames written to {profile_dump}")
     
     pygame.quit()
 
+# Step a world without a display or audio as fast as possible
+def run_headless(steps, seed=None, policy=None, autopilot=False):
+    world = World(seed, effects=False)
+    policy = policy or (AutopilotPolicy if autopilot else RandomWalkPolicy)(world.seed)
+    
+    # Skip the start screen
+    world.step(PlayerInput(space=True))
+    for _ in range(steps):
+        world.step(policy(world))
+    return world
+
+# Parse command line options
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Katamari Adventure")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="master seed for world generation (random if omitted)")
+    parser.add_argument("--headless", type=int, default=None, metavar="STEPS",
+                        help="simulate STEPS frames with random input and no display or audio, then exit")
+    parser.add_argument("--autopilot", action="store_true",
+                        help="let the computer play: in the window as a demo, or instead of random input with --headless")
+    parser.add_argument("--world-size", type=int, default=WORLD_SIZE, metavar="SIZE",
+                        help=f"side of the square world (default {WORLD_SIZE}, 0 = no edges)")
+    parser.add_argument("--fps", type=int, default=FPS,
+                        help=f"frame rate cap (default {FPS}, 0 = uncapped); the simulation always runs at {SIM_RATE} steps/s")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="only repaint and present the parts of the screen that changed")
+    parser.add_argument("--record", default=None, metavar="FILE",
+                        help="record the seed and every frame's input to FILE for replaying")
+    parser.add_argument("--replay", default=None, metavar="FILE",
+                        help="play back a recording in the window (with --fps 0 as fast as it can draw)")
+    parser.add_argument("--replay-headless", default=None, metavar="FILE",
+                        help="play back a recording without display or audio as fast as possible, then exit")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="print how long each start-up phase took once the first frame is shown")
+    parser.add_argument("--profile-dump", default=None, metavar="CSV",
+                        help="write per-stage timings of the last frames to CSV on exit")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    main()
-# Power-up class
-class PowerUp:
-    TYPES = [
-        {"name": "speed", "color": (255, 255, 0), "duration": 5, "icon": "⚡"},
-        {"name": "magnet", "color": (255, 0, 255), "duration": 7, "icon": "🧲"},
-        {"name": "invincible", "color": (0, 255, 255), "duration": 4, "icon": "⭐"},
-        {"name": "growth", "color": (255, 150, 0), "duration": 6, "icon": "⬆️"}
-    ]
-    
-    def __init__(self, x, y):
-        self.world_x = x
-        self.world_y = y
-        self.x = x  # Screen coordinates, will be updated by camera
-        self.y = y
-        self.size = 15
-        self.bounce = 0
-        self.bounce_dir = 1
-        self.rotation = random.randint(0, 360)
-        self.anim_offset = random.randint(0, 100)
-        self.anim_speed = random.uniform(0.02, 0.05)
-        
-        # Choose a random power-up type
-        self.type = random.choice(PowerUp.TYPES)
-        self.color = self.type["color"]
-        self.name = self.type["name"]
-        self.duration = self.type["duration"]
-        self.icon = self.type["icon"]
-        
-    def update(self):
-        # Simple animation
-        self.bounce += 0.1 * self.bounce_dir
-        if abs(self.bounce) > 3:
-            self.bounce_dir *= -1
-        
-        # Rotate slowly
-        self.rotation = (self.rotation + 1) % 360
-    
-    def draw(self, camera):
-        # Convert world coordinates to screen coordinates
-        self.x, self.y = camera.apply(self.world_x, self.world_y)
-        
-        # Only draw if on screen (with a small buffer)
-        if (-self.size*2 <= self.x <= SCREEN_WIDTH + self.size*2 and
-            -self.size*2 <= self.y <= SCREEN_HEIGHT + self.size*2):
-            
-            # Apply bounce animation
-            y_offset = math.sin(pygame.time.get_ticks() * self.anim_speed + self.anim_offset) * 5
-            
-            # Draw glowing effect
-            glow_size = self.size * 1.5 + math.sin(pygame.time.get_ticks() * 0.01) * 2
-            glow_surface = pygame.Surface((int(glow_size*2), int(glow_size*2)), pygame.SRCALPHA)
-            for i in range(3):
-                alpha = 100 - i * 30
-                size = glow_size - i * 2
-                pygame.draw.circle(glow_surface, (*self.color, alpha), 
-                                 (int(glow_size), int(glow_size)), int(size))
-            screen.blit(glow_surface, 
-                      (int(self.x - glow_size), int(self.y - glow_size + y_offset)))
-            
-            # Draw power-up
-            pygame.draw.circle(screen, self.color, 
-                             (int(self.x), int(self.y + y_offset)), int(self.size))
-            
-            # Draw icon or symbol
-            font = pygame.font.Font(None, 24)
-            icon_text = font.render(self.icon, True, WHITE)
-            screen.blit(icon_text, (int(self.x - icon_text.get_width()/2), 
-                                  int(self.y - icon_text.get_height()/2 + y_offset)))
-    
-    def check_collision(self, player):
-        # Calculate distance between centers in world coordinates
-        distance = math.sqrt((self.world_x - player.world_x)**2 + (self.world_y - player.world_y)**2)
-        # Check if circles overlap
-        return distance < (self.size + player.size)
+    args = parse_args()
+    WORLD_SIZE = args.world_size or None
+    if args.replay_headless is not None:
+        start_time = time.perf_counter()
+        world, frames, matched = run_replay(args.replay_headless)
+        elapsed = time.perf_counter() - start_time
+        result = {None: "has no final digest to check", True: "matches", False: "does NOT match"}[matched]
+        print(f"Replayed {frames} frames ({world.frame} steps) in {elapsed:.2f} s, final state {result} the recording")
+        print(f"Seed {world.seed}: level {world.current_level}, size {world.player.size:.1f}, score {world.player.score}")
+    elif args.headless is not None:
+        start_time = time.perf_counter()
+        world = run_headless(args.headless, seed=args.seed, autopilot=args.autopilot)
+        elapsed = time.perf_counter() - start_time
+        print(f"Seed {world.seed}: level {world.current_level}, size {world.player.size:.1f}, "
+              f"score {world.player.score}, {args.headless / max(elapsed, 1e-9):.0f} steps/s")
+    else:
+        main(seed=args.seed, profile_dump=args.profile_dump, fps=args.fps, startup_report=args.startup_report,
+             dirty=args.dirty_rects, record=args.record, replay=args.replay,
+             autopilot=args.autopilot)
@@ -0,0 +1,247 @@
+import argparse
+import csv
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import katamari_game as game
+
+# Game settings a sweep can vary, with the parser for one value of each. Power-up
+# durations are set per type as DURATION_<NAME>, e.g. DURATION_MAGNET.
+def parse_goals(text):
+    return [int(goal) for goal in text.split(":")]
+
+PARAMETERS = {
+    "GROW_FACTOR": float,
+    "SHRINK_FACTOR": float,
+    "LEVEL_GOALS": parse_goals,
+    "OBJECTS_PER_CHUNK": int,
+    "OBJECT_REFILL": int,
+    "POWERUP_COUNT": int,
+    "POWERUP_CHUNK_CHANCE": float
+}
+for powerup_type in game.PowerUp.TYPES:
+    PARAMETERS[f"DURATION_{powerup_type['name'].upper()}"] = float
+
+POWERUP_NAMES = [powerup_type["name"] for powerup_type in game.PowerUp.TYPES]
+POLICIES = ["random", "autopilot"]
+
+# Parse "NAME=v1,v2,..." into (NAME, [values])
+def parse_param(text):
+    name, _, values = text.partition("=")
+    name = name.strip().upper()
+    if name not in PARAMETERS:
+        raise argparse.ArgumentTypeError(f"unknown parameter {name}, choose from {', '.join(PARAMETERS)}")
+    try:
+        return name, [PARAMETERS[name](value) for value in values.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"bad value in {text}")
+
+# Every combination of the parameter values, as a list of {name: value} dicts
+def expand_grid(params):
+    names = [name for name, _ in params]
+    return [dict(zip(names, values)) for values in itertools.product(*(values for _, values in params))]
+
+# Set the game's module settings for one session, returning what to put back afterwards
+def apply_params(params):
+    saved = {}
+    for name, value in params.items():
+        if name.startswith("DURATION_"):
+            powerup_type = next(t for t in game.PowerUp.TYPES if t["name"].upper() == name[len("DURATION_"):])
+            saved[name] = powerup_type["duration"]
+            powerup_type["duration"] = value
+        else:
+            saved[name] = getattr(game, name)
+            setattr(game, name, value)
+    return saved
+
+# Input policy replaying the movement of a recording step by step, looping at the end.
+# SPACE is pressed whenever a level is complete, since levels end at different times
+# once the settings change.
+class ScriptedPolicy:
+    def __init__(self, path):
+        replay = game.InputReplay(path)
+        self.moves = []
+        while True:
+            frame = replay.next_frame()
+            if frame is None:
+                break
+            _, bits, steps, _, _ = frame
+            moves = game.PlayerInput.from_keys(game.keys_from_bits(bits))
+            self.moves.extend([(moves.dx, moves.dy)] * steps)
+        replay.close()
+        if not self.moves:
+            raise ValueError(f"{path} has no recorded steps")
+        self.step = 0
+    
+    def __call__(self, world):
+        dx, dy = self.moves[self.step % len(self.moves)]
+        self.step += 1
+        return game.PlayerInput(dx, dy, space=world.level_complete or world.game_state != "playing")
+
+def make_policy(policy, seed):
+    if policy == "random":
+        return game.RandomWalkPolicy(seed)
+    if policy == "autopilot":
+        return game.AutopilotPolicy(seed)
+    return ScriptedPolicy(policy)
+
+# Play one display-free session and summarise it as a flat dict
+def run_session(task):
+    params, seed, steps, policy = task
+    saved = apply_params(params)
+    try:
+        start_time = time.perf_counter()
+        world = game.World(seed, level_goals=game.LEVEL_GOALS, effects=False)
+        inputs = make_policy(policy, seed)
+        world.step(game.PlayerInput(space=True))
+        
+        absorptions = shrinks = 0
+        powerups = dict.fromkeys(POWERUP_NAMES, 0)
+        level_steps = {}
+        for step in range(steps):
+            world.step(inputs(world))
+            for event in world.events:
+                if event == "grow":
+                    absorptions += 1
+                elif event == "shrink":
+                    shrinks += 1
+                elif event == "win" and world.level_complete and world.current_level not in level_steps:
+                    level_steps[world.current_level] = step + 1
+            
+            # Power-ups collected this step are the newest active ones
+            collected = world.events.count("powerup")
+            if collected:
+                for effect in world.player.active_powerups[-collected:]:
+                    powerups[effect["name"]] += 1
+            if world.game_state == "game_over":
+                break
+        
+        row = {"seed": seed, "policy": policy}
+        for name, value in params.items():
+            row[name] = ":".join(map(str, value)) if isinstance(value, list) else value
+        row.update({
+            "steps": world.frame - 1,
+            "level": min(world.current_level, len(world.level_goals)),
+            "levels_completed": len(level_steps),
+            "size": round(world.player.size, 3),
+            "score": world.player.score,
+            "absorptions": absorptions,
+            "shrinks": shrinks,
+            "powerups": sum(powerups.values())
+        })
+        for name in POWERUP_NAMES:
+            row[f"powerups_{name}"] = powerups[name]
+        for level in range(1, len(game.LEVEL_GOALS) + 1):
+            row[f"level_{level}_step"] = level_steps.get(level)
+        row["seconds"] = round(time.perf_counter() - start_time, 4)
+        return row
+    finally:
+        apply_params(saved)
+
+# Column names and types of the results, fixed before the first row comes back
+def result_columns(params, max_levels):
+    columns = [("seed", int), ("policy", str)]
+    for name, values in params:
+        columns.append((name, str if name == "LEVEL_GOALS" else type(values[0])))
+    columns += [("steps", int), ("level", int), ("levels_completed", int), ("size", float), ("score", int),
+                ("absorptions", int), ("shrinks", int), ("powerups", int)]
+    columns += [(f"powerups_{name}", int) for name in POWERUP_NAMES]
+    columns += [(f"level_{level}_step", int) for level in range(1, max_levels + 1)]
+    columns.append(("seconds", float))
+    return columns
+
+# Streams rows to a Parquet file one row group per batch, or to CSV when the output
+# name ends in .csv or pyarrow isn't installed
+class ResultWriter:
+    def __init__(self, path, columns):
+        self.columns = columns
+        self.parquet = None
+        if not path.endswith(".csv"):
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError:
+                path = os.path.splitext(path)[0] + ".csv"
+                print(f"pyarrow is not installed, writing CSV to {path} instead")
+            else:
+                types = {int: pyarrow.int64(), float: pyarrow.float64(), str: pyarrow.string()}
+                self.pyarrow = pyarrow
+                self.schema = pyarrow.schema([(name, types[kind]) for name, kind in columns])
+                self.parquet = pyarrow.parquet.ParquetWriter(path, self.schema)
+        if self.parquet is None:
+            self.file = open(path, "w", newline="")
+            self.csv = csv.DictWriter(self.file, [name for name, _ in columns], extrasaction="ignore")
+            self.csv.writeheader()
+        self.path = path
+    
+    def write(self, rows):
+        if not rows:
+            return
+        if self.parquet is not None:
+            # Goals of a shorter level list leave the later level columns empty
+            rows = [{name: row.get(name) for name, _ in self.columns} for row in rows]
+            self.parquet.write_table(self.pyarrow.Table.from_pylist(rows, schema=self.schema))
+        else:
+            self.csv.writerows(rows)
+            self.file.flush()
+    
+    def close(self):
+        if self.parquet is not None:
+            self.parquet.close()
+        else:
+            self.file.close()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Play many seeded, display-free Katamari Adventure sessions "
+                                                 "over a grid of game settings and collect the results")
+    parser.add_argument("--param", type=parse_param, action="append", default=[], metavar="NAME=V1,V2,...",
+                        help="setting to sweep; repeat for a grid. LEVEL_GOALS values are colon-separated "
+                             f"goal lists. Settings: {', '.join(PARAMETERS)}")
+    parser.add_argument("--seeds", type=int, default=100, help="sessions per grid point")
+    parser.add_argument("--first-seed", type=int, default=1, help="master seed of the first session")
+    parser.add_argument("--steps", type=int, default=60 * game.SIM_RATE,
+                        help="simulation steps per session at most (default: one minute of play)")
+    parser.add_argument("--policy", default="random",
+                        help="input policy: 'random', 'autopilot', or a recording made with --record whose movement is looped")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--batch", type=int, default=256, help="sessions written per batch")
+    parser.add_argument("--output", default="sweep_results.parquet",
+                        help="results file, Parquet (needs pyarrow) or .csv")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.policy not in POLICIES:
+        make_policy(args.policy, 0)  # Fail early on a bad recording
+    
+    grid = expand_grid(args.param)
+    tasks = [(params, seed, args.steps, args.policy)
+             for params in grid for seed in range(args.first_seed, args.first_seed + args.seeds)]
+    max_levels = max((len(params.get("LEVEL_GOALS", game.LEVEL_GOALS)) for params in grid))
+    writer = ResultWriter(args.output, result_columns(args.param, max_levels))
+    print(f"{len(tasks)} sessions ({len(grid)} grid points x {args.seeds} seeds) on {args.workers} workers")
+    
+    # Results come back in task order and are written a batch at a time
+    start_time = time.perf_counter()
+    batch = []
+    done = 0
+    with ProcessPoolExecutor(args.workers) as pool:
+        for row in pool.map(run_session, tasks, chunksize=max(1, min(16, len(tasks) // (args.workers * 4)))):
+            batch.append(row)
+            done += 1
+            if len(batch) >= args.batch:
+                writer.write(batch)
+                batch = []
+                elapsed = time.perf_counter() - start_time
+                print(f"  {done}/{len(tasks)} sessions, {done / elapsed:.1f} sessions/s")
+    writer.write(batch)
+    writer.close()
+    
+    elapsed = time.perf_counter() - start_time
+    print(f"{len(tasks)} sessions in {elapsed:.1f} s, results written to {writer.path}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])